@@ -0,0 +1,183 @@
+"""Dynamic micro-batching of concurrent KGE scoring requests."""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import torch
+from pykeen.typing import LABEL_TAIL
+
+# A reducer turns one row of scores into the result a request needs
+# (e.g. its top K or the rank of one entity); it runs on the inference thread.
+Reducer = Callable[[torch.Tensor], Any]
+
+
+@dataclass
+class _PendingRequest:
+    anchor_id: int
+    relation_id: int
+    reduce: Reducer
+    future: asyncio.Future
+    candidate_ids: Optional[torch.Tensor] = None
+    target: str = LABEL_TAIL
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """Collects concurrent (anchor, relation) queries into one batched forward pass.
+
+    Requests wait at most ``max_wait_ms`` for companions, or until
+    ``max_batch_size`` are queued, and are then scored together by
+    ``score_fn(anchor_ids, relation_ids, candidate_ids, target)`` through
+    ``run``, the coroutine that dispatches work to the inference executor.
+    Requests for the same target (heads or tails) and candidate set share one
+    call. Each request's
+    reducer is applied to its own row of scores before results are handed back.
+    """
+
+    def __init__(
+        self,
+        score_fn: Callable[
+            [Sequence[int], Sequence[int], Optional[torch.Tensor], str],
+            torch.Tensor,
+        ],
+        run: Callable[..., Awaitable[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+    ):
+        self.score_fn = score_fn
+        self.run = run
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: List[_PendingRequest] = []
+        self._flush_handle = None
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._max_batch = 0
+        self._wait_seconds = 0.0
+        self._latency_seconds = 0.0
+        self._busy_seconds = 0.0
+        self._started_at = time.perf_counter()
+
+    async def submit(
+        self,
+        anchor_id: int,
+        relation_id: int,
+        reduce: Reducer,
+        candidate_ids: Optional[torch.Tensor] = None,
+        target: str = LABEL_TAIL,
+    ) -> Any:
+        """Queue a query and wait for its reduced row of scores.
+
+        The anchor is the head when ``target`` is ``"tail"`` and the tail when it
+        is ``"head"``. With ``candidate_ids`` only those entities are scored and
+        the row passed to ``reduce`` follows their order.
+        """
+        loop = asyncio.get_running_loop()
+        request = _PendingRequest(
+            anchor_id,
+            relation_id,
+            reduce,
+            loop.create_future(),
+            candidate_ids,
+            target,
+        )
+        self._queue.append(request)
+
+        if len(self._queue) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1e3, self._flush)
+
+        return await request.future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._queue:
+            batch = self._queue[: self.max_batch_size]
+            del self._queue[: self.max_batch_size]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[_PendingRequest]) -> None:
+        started_at = time.perf_counter()
+        try:
+            outcomes = await self.run(self._score_batch, batch)
+        except Exception as e:
+            outcomes = [(False, e)] * len(batch)
+        finished_at = time.perf_counter()
+
+        for request, (ok, value) in zip(batch, outcomes):
+            if request.future.done():
+                continue
+            if ok:
+                request.future.set_result(value)
+            else:
+                request.future.set_exception(value)
+
+        with self._lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._max_batch = max(self._max_batch, len(batch))
+            self._busy_seconds += finished_at - started_at
+            for request in batch:
+                self._wait_seconds += started_at - request.enqueued_at
+                self._latency_seconds += finished_at - request.enqueued_at
+
+    def _score_batch(self, batch: List[_PendingRequest]) -> List[tuple]:
+        # Candidate sets are shared tensors (e.g. one per label), so identity
+        # is enough to group the requests that can be scored together
+        groups: Dict[Tuple[str, int], List[int]] = {}
+        for position, request in enumerate(batch):
+            key = (request.target, id(request.candidate_ids))
+            groups.setdefault(key, []).append(position)
+
+        outcomes: List[tuple] = [None] * len(batch)
+        for positions in groups.values():
+            requests = [batch[position] for position in positions]
+            scores = self.score_fn(
+                [request.anchor_id for request in requests],
+                [request.relation_id for request in requests],
+                requests[0].candidate_ids,
+                requests[0].target,
+            )
+            for position, request, row in zip(positions, requests, scores):
+                try:
+                    outcomes[position] = (True, request.reduce(row))
+                except Exception as e:
+                    outcomes[position] = (False, e)
+        return outcomes
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return throughput and latency counters for tuning the batch window."""
+        with self._lock:
+            uptime = time.perf_counter() - self._started_at
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "queued": len(self._queue),
+                "batches": self._batches,
+                "requests": self._requests,
+                "max_observed_batch": self._max_batch,
+                "avg_batch_size": (self._requests / self._batches)
+                if self._batches
+                else 0.0,
+                "avg_wait_ms": (self._wait_seconds / self._requests * 1e3)
+                if self._requests
+                else 0.0,
+                "avg_latency_ms": (self._latency_seconds / self._requests * 1e3)
+                if self._requests
+                else 0.0,
+                "avg_batch_ms": (self._busy_seconds / self._batches * 1e3)
+                if self._batches
+                else 0.0,
+                "requests_per_second": (self._requests / uptime) if uptime else 0.0,
+            }
@@ -0,0 +1,70 @@
+"""Report top-K agreement of reduced-precision embeddings with float32.
+
+Run from the project root after exporting the embedding store:
+
+    python -m app.kge.benchmark_precision --queries 200 --top-k 10
+"""
+
+import argparse
+import random
+import time
+
+import torch
+
+from app.kge.embeddings import ENTITY_FILES, open_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-path", default="app/data/model_epoch_final.pkl")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    reference = open_engine(args.model_path, "fp32", require_store=True)
+    rng = random.Random(args.seed)
+    num_relations = reference.store.relations.shape[0] // reference.relation_stride
+    queries = [
+        (rng.randrange(reference.num_entities), rng.randrange(num_relations))
+        for _ in range(args.queries)
+    ]
+
+    print(f"queries: {len(queries)} (top {args.top_k})")
+    print(
+        f"{'precision':<10} {'entities MB':>12} {'ms/query':>9} {'overlap@K':>10} {'identical':>10} {'max |err|':>10}"
+    )
+    expected = None
+    for precision in ENTITY_FILES:
+        engine = (
+            reference
+            if precision == "fp32"
+            else open_engine(args.model_path, precision, require_store=True)
+        )
+
+        start = time.perf_counter()
+        results = [engine.predict_tail(h, r, args.top_k) for h, r in queries]
+        ms = (time.perf_counter() - start) / len(queries) * 1e3
+
+        with torch.inference_mode():
+            heads, relations = zip(*queries)
+            scores = engine.score_tails(heads, relations)
+        if expected is None:
+            expected, expected_scores = results, scores
+
+        overlap = sum(
+            len(set(ids.tolist()) & set(ref.tolist()))
+            for (ids, _), (ref, _) in zip(results, expected)
+        ) / sum(len(ref) for ref, _ in expected)
+        identical = sum(
+            torch.equal(ids, ref) for (ids, _), (ref, _) in zip(results, expected)
+        )
+        error = float((scores - expected_scores).abs().max())
+        print(
+            f"{precision:<10} {engine.store.entity_bytes / 2**20:>12.2f} {ms:>9.2f} "
+            f"{overlap:>10.3f} {identical:>5}/{len(queries):<4} {error:>10.2e}",
+        )
+
+
+if __name__ == "__main__":
+    main()
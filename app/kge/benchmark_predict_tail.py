@@ -0,0 +1,60 @@
+"""Compare the vectorized top-K engine against ``pykeen.predict.predict_target``.
+
+Run from the project root:
+
+    python -m app.kge.benchmark_predict_tail --queries 200 --top-k 10
+"""
+
+import argparse
+import random
+import time
+
+import torch
+from pykeen import predict
+
+from app.kge.scoring import ModelScoringEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-path", default="app/data/model_epoch_final.pkl")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = torch.load(args.model_path, map_location="cpu", weights_only=False)
+    engine = ModelScoringEngine(model)
+
+    rng = random.Random(args.seed)
+    queries = [
+        (rng.randrange(model.num_entities), rng.randrange(model.num_relations))
+        for _ in range(args.queries)
+    ]
+
+    start = time.perf_counter()
+    reference = [
+        predict.predict_target(model=model, head=h, relation=r)
+        .df.head(args.top_k)["tail_id"]
+        .tolist()
+        for h, r in queries
+    ]
+    pandas_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidate = [engine.predict_tail(h, r, args.top_k)[0].tolist() for h, r in queries]
+    engine_seconds = time.perf_counter() - start
+
+    # predict_target does not order ties, so compare the sets of ids as well
+    identical = sum(ref == cand for ref, cand in zip(reference, candidate))
+    same_set = sum(set(ref) == set(cand) for ref, cand in zip(reference, candidate))
+
+    print(f"queries:             {len(queries)} (top {args.top_k})")
+    print(f"predict_target:      {pandas_seconds / len(queries) * 1e3:.2f} ms/query")
+    print(f"ModelScoringEngine:  {engine_seconds / len(queries) * 1e3:.2f} ms/query")
+    print(f"identical rankings:  {identical}/{len(queries)}")
+    print(f"identical top-K set: {same_set}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
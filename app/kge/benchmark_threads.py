@@ -0,0 +1,99 @@
+"""Compare scoring latency with torch's default thread pools and with the budget.
+
+Simulates ``--workers`` server processes, each running ``--inference-threads``
+concurrent scoring threads, as gunicorn does. Run from the project root:
+
+    python -m app.kge.benchmark_threads --workers 4 --inference-threads 2
+"""
+
+import argparse
+import multiprocessing
+import random
+import threading
+import time
+
+import numpy as np
+
+from app.kge.embeddings import open_engine
+from app.kge.relations import edge_mapping
+from app.kge.threads import apply_thread_budget, available_cpus, warm_up
+
+
+def _worker(args, budgeted: bool, seed: int, barrier, results) -> None:
+    if budgeted:
+        apply_thread_budget(args.workers, args.inference_threads)
+    engine = open_engine(args.model_path)
+    warm_up(engine, args.batch_size)
+    relation_ids = sorted(set(edge_mapping.values()))
+
+    latencies = []
+    lock = threading.Lock()
+
+    def run(thread_seed: int) -> None:
+        rng = random.Random(thread_seed)
+        own = []
+        for _ in range(args.requests):
+            heads = [rng.randrange(engine.num_entities) for _ in range(args.batch_size)]
+            relations = [rng.choice(relation_ids) for _ in range(args.batch_size)]
+            start = time.perf_counter()
+            engine.predict_tails(heads, relations, [args.top_k] * args.batch_size)
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [
+        threading.Thread(target=run, args=(seed * 1000 + i,))
+        for i in range(args.inference_threads)
+    ]
+    # Start every process's load at once so they contend for the CPU
+    barrier.wait()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(latencies)
+
+
+def _measure(args, budgeted: bool) -> np.ndarray:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(args, budgeted, seed, barrier, results))
+        for seed in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    latencies = [latency for _ in processes for latency in results.get()]
+    for process in processes:
+        process.join()
+    return np.asarray(latencies) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-path", default="app/data/model_epoch_final.pkl")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--inference-threads", type=int, default=2)
+    parser.add_argument(
+        "--requests", type=int, default=200, help="Queries per inference thread"
+    )
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(
+        f"{available_cpus()} CPUs, {args.workers} workers x {args.inference_threads} "
+        f"inference threads, batch size {args.batch_size}",
+    )
+    print(f"{'threads':<10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, budgeted in (("default", False), ("budgeted", True)):
+        latencies = _measure(args, budgeted)
+        print(
+            f"{name:<10} {np.percentile(latencies, 50):>8.2f} "
+            f"{np.percentile(latencies, 99):>8.2f} {latencies.max():>8.2f}",
+        )
+
+
+if __name__ == "__main__":
+    main()
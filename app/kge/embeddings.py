@@ -0,0 +1,343 @@
+"""Flat, memory-mapped embedding store shared by every worker.
+
+``torch.load`` of the model pickle gives each gunicorn/uvicorn worker a private
+copy of every parameter. Exporting the entity and relation embeddings once to
+``.npy`` files and opening them with ``mmap`` lets all workers share the same
+page-cache pages instead, and a worker starts without unpickling the model.
+
+The entity table is also written at reduced precision: float16, and int8 with
+one float32 scale per row. ``KGE_EMBEDDING_PRECISION`` picks the table a worker
+maps; scores are always accumulated in float32, a chunk of rows at a time.
+
+Each model version is exported to its own directory, and a directory is only
+ever published whole, so files a worker has mapped are never rewritten. Export
+the store next to the model (re-run after every retraining):
+
+    python -m app.kge.embeddings --model-path app/data/model_epoch_final.pkl
+"""
+
+import argparse
+import json
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+import torch
+from pykeen.typing import LABEL_HEAD, LABEL_TAIL
+
+from app.kge.scoring import ModelScoringEngine, ScoringEngine
+from app.kge.versioning import file_version, publish_directory
+
+# PyKEEN interaction classes whose scores can be reproduced from raw embeddings
+SUPPORTED_INTERACTIONS = {
+    "DistMultInteraction": "distmult",
+    "TransEInteraction": "transe",
+    "ComplExInteraction": "complex",
+}
+
+# Entity tables per serving precision; int8 rows are multiplied by their scale
+ENTITY_FILES = {
+    "fp32": "entities.npy",
+    "fp16": "entities.fp16.npy",
+    "int8": "entities.int8.npy",
+}
+ENTITY_SCALES_FILE = "entity_scales.npy"
+RELATIONS_FILE = "relations.npy"
+META_FILE = "meta.json"
+
+# Entity rows dequantized and scored at once; bounds the float32 working set
+SCORE_CHUNK_SIZE = 65536
+
+
+def default_store_path(model_path: str, model_version: str) -> str:
+    return os.path.join(f"{os.path.splitext(model_path)[0]}.embeddings", model_version)
+
+
+def _as_real(embeddings: torch.Tensor) -> np.ndarray:
+    """Flatten complex embeddings to ``[real | imag]`` float32 rows."""
+    embeddings = embeddings.detach().cpu()
+    if torch.is_complex(embeddings):
+        embeddings = torch.cat([embeddings.real, embeddings.imag], dim=-1)
+    return np.ascontiguousarray(embeddings.numpy(), dtype=np.float32)
+
+
+def quantize_int8(embeddings: np.ndarray):
+    """Symmetric per-row int8 quantization; returns ``(rows, scales)``."""
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    rows = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+    return rows, scales.astype(np.float32)
+
+
+def export_embeddings(model, directory: str, model_version: str) -> None:
+    """Write the model's embeddings and scoring metadata to ``directory``.
+
+    The files are staged next to ``directory`` and published in one rename.
+    """
+    interaction_name = type(model.interaction).__name__
+    if interaction_name not in SUPPORTED_INTERACTIONS:
+        raise ValueError(
+            f"Interaction '{interaction_name}' cannot be served from exported embeddings; "
+            f"supported: {', '.join(SUPPORTED_INTERACTIONS)}",
+        )
+
+    with torch.inference_mode():
+        entities = _as_real(model.entity_representations[0](indices=None))
+        relations = _as_real(model.relation_representations[0](indices=None))
+
+    int8_rows, int8_scales = quantize_int8(entities)
+    meta = {
+        "model_version": model_version,
+        "interaction": SUPPORTED_INTERACTIONS[interaction_name],
+        "p": getattr(model.interaction, "p", None),
+        "power_norm": bool(getattr(model.interaction, "power_norm", False)),
+        "predict_with_sigmoid": bool(model.predict_with_sigmoid),
+        # With inverse triples, relation r is stored at row 2r and its inverse at 2r + 1
+        "use_inverse_triples": bool(model.use_inverse_triples),
+        "num_entities": int(entities.shape[0]),
+        "num_relations": int(relations.shape[0]),
+    }
+    with publish_directory(directory) as staging:
+        np.save(os.path.join(staging, ENTITY_FILES["fp32"]), entities)
+        np.save(
+            os.path.join(staging, ENTITY_FILES["fp16"]), entities.astype(np.float16)
+        )
+        np.save(os.path.join(staging, ENTITY_FILES["int8"]), int8_rows)
+        np.save(os.path.join(staging, ENTITY_SCALES_FILE), int8_scales)
+        np.save(os.path.join(staging, RELATIONS_FILE), relations)
+        with open(os.path.join(staging, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+
+
+class EmbeddingStore:
+    """Read-only view of an exported store, backed by ``mmap``.
+
+    Only the entity table of the requested ``precision`` is mapped; relations
+    are few and always float32.
+    """
+
+    def __init__(self, directory: str, precision: str = "fp32"):
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.precision = precision
+        # Copy-on-write mappings share clean pages between processes and give
+        # writable arrays, which torch.from_numpy requires
+        self.entities = torch.from_numpy(
+            np.load(os.path.join(directory, ENTITY_FILES[precision]), mmap_mode="c"),
+        )
+        self.entity_scales = None
+        if precision == "int8":
+            self.entity_scales = torch.from_numpy(
+                np.load(os.path.join(directory, ENTITY_SCALES_FILE), mmap_mode="c"),
+            )
+        self.relations = torch.from_numpy(
+            np.load(os.path.join(directory, RELATIONS_FILE), mmap_mode="c"),
+        )
+
+    def entity_rows(self, ids=None) -> torch.Tensor:
+        """Return the entity rows at ``ids`` (an index tensor or slice) as float32."""
+        if ids is None:
+            ids = slice(None)
+        rows = self.entities[ids].float()
+        if self.entity_scales is not None:
+            rows = rows * self.entity_scales[ids].unsqueeze(-1)
+        return rows
+
+    @property
+    def entity_bytes(self) -> int:
+        """Size of the mapped entity table, including int8 scales."""
+        size = self.entities.numel() * self.entities.element_size()
+        if self.entity_scales is not None:
+            size += self.entity_scales.numel() * self.entity_scales.element_size()
+        return size
+
+    @property
+    def model_version(self) -> str:
+        return self.meta["model_version"]
+
+    @classmethod
+    def open_if_current(
+        cls, directory: str, model_version: str, precision: str = "fp32"
+    ):
+        """Return the store in ``directory`` if it was exported from ``model_version``."""
+        try:
+            store = cls(directory, precision)
+        except (OSError, ValueError):
+            return None
+        return store if store.model_version == model_version else None
+
+
+class EmbeddingScoringEngine(ScoringEngine):
+    """Reproduces the PyKEEN interaction on memory-mapped embeddings."""
+
+    def __init__(self, store: EmbeddingStore):
+        self.store = store
+        self.interaction = store.meta["interaction"]
+        self.p = store.meta["p"]
+        self.power_norm = store.meta["power_norm"]
+        self.predict_with_sigmoid = store.meta["predict_with_sigmoid"]
+        self.relation_stride = 2 if store.meta["use_inverse_triples"] else 1
+
+    @property
+    def num_entities(self) -> int:
+        return self.store.entities.shape[0]
+
+    @property
+    def precision(self) -> str:
+        return self.store.precision
+
+    def query_vectors(
+        self,
+        anchor_ids: Sequence[int],
+        relation_ids: Sequence[int],
+        target: str = LABEL_TAIL,
+    ) -> torch.Tensor:
+        """Fold each (anchor, relation) pair into one vector compared against the targets.
+
+        The anchor is the head when scoring tails and the tail when scoring heads.
+        """
+        relation_ids = (
+            torch.as_tensor(relation_ids, dtype=torch.long) * self.relation_stride
+        )
+        anchors = self.store.entity_rows(torch.as_tensor(anchor_ids, dtype=torch.long))
+        if target == LABEL_HEAD and self.relation_stride == 2:
+            # Like PyKEEN, score heads as the tails of the inverse relation
+            relation_ids = relation_ids + 1
+            target = LABEL_TAIL
+        relations = self.store.relations[relation_ids]
+
+        if self.interaction == "complex":
+            a_re, a_im = anchors.chunk(2, dim=-1)
+            r_re, r_im = relations.chunk(2, dim=-1)
+            if target == LABEL_HEAD:
+                # Re(<h, r, conj(t)>) == [Re(h) | Im(h)] . [Re(r*conj(t)) | -Im(r*conj(t))]
+                return torch.cat(
+                    [r_re * a_re + r_im * a_im, r_re * a_im - r_im * a_re],
+                    dim=-1,
+                )
+            # Re(<h, r, conj(t)>) == [Re(h*r) | Im(h*r)] . [Re(t) | Im(t)]
+            return torch.cat(
+                [a_re * r_re - a_im * r_im, a_re * r_im + a_im * r_re],
+                dim=-1,
+            )
+        if self.interaction == "transe":
+            # ||h + r - t|| is the distance of the tail to h + r, or of the head to t - r
+            return anchors - relations if target == LABEL_HEAD else anchors + relations
+        return anchors * relations
+
+    @property
+    def metric(self) -> str:
+        """Similarity the scores reduce to: ``"l2"`` distance or inner product."""
+        return "l2" if self.interaction == "transe" else "ip"
+
+    def _score(
+        self,
+        queries: torch.Tensor,
+        candidate_ids: Optional[torch.Tensor] = None,
+    ) -> torch.Tensor:
+        """Score ``queries`` against every entity, or only ``candidate_ids``.
+
+        Entity rows are converted to float32 a chunk at a time, so reduced
+        precision tables are never expanded in full.
+        """
+        total = self.num_entities if candidate_ids is None else len(candidate_ids)
+        chunks = []
+        for start in range(0, total, SCORE_CHUNK_SIZE):
+            stop = start + SCORE_CHUNK_SIZE
+            ids = (
+                slice(start, stop)
+                if candidate_ids is None
+                else candidate_ids[start:stop]
+            )
+            entities = self.store.entity_rows(ids)
+            if self.interaction == "transe":
+                distances = torch.cdist(queries, entities, p=self.p)
+                chunks.append(-(distances**self.p) if self.power_norm else -distances)
+            else:
+                chunks.append(queries @ entities.T)
+        scores = (
+            torch.cat(chunks, dim=1) if chunks else queries.new_empty((len(queries), 0))
+        )
+        if self.predict_with_sigmoid:
+            scores = torch.sigmoid(scores)
+        return scores
+
+    def score_tails(
+        self,
+        head_ids: Sequence[int],
+        relation_ids: Sequence[int],
+    ) -> torch.Tensor:
+        """Score every tail for each (head, relation) pair, as the model would."""
+        with torch.inference_mode():
+            return self._score(self.query_vectors(head_ids, relation_ids))
+
+    def score_heads(
+        self,
+        tail_ids: Sequence[int],
+        relation_ids: Sequence[int],
+    ) -> torch.Tensor:
+        """Score every head for each (tail, relation) pair, as the model would."""
+        with torch.inference_mode():
+            return self._score(self.query_vectors(tail_ids, relation_ids, LABEL_HEAD))
+
+    def score_candidates(
+        self,
+        anchor_ids: Sequence[int],
+        relation_ids: Sequence[int],
+        candidate_ids: torch.Tensor,
+        target: str = LABEL_TAIL,
+    ) -> torch.Tensor:
+        """Score only ``candidate_ids`` for each pair; shape ``(pairs, candidates)``."""
+        with torch.inference_mode():
+            return self._score(
+                self.query_vectors(anchor_ids, relation_ids, target),
+                candidate_ids,
+            )
+
+
+def open_engine(
+    model_path: str,
+    precision: str = "fp32",
+    require_store: bool = False,
+) -> ScoringEngine:
+    """Score like the API does: from the current embedding store of ``model_path``.
+
+    Without a store exported from this model, the model pickle is loaded
+    instead, or the command exits if ``require_store``.
+    """
+    version = file_version(model_path)
+    store = EmbeddingStore.open_if_current(
+        default_store_path(model_path, version), version, precision
+    )
+    if store is not None:
+        return EmbeddingScoringEngine(store)
+    if require_store:
+        raise SystemExit(
+            f"No current {precision} embedding store found; "
+            "run `python -m app.kge.embeddings` first.",
+        )
+    model = torch.load(model_path, map_location="cpu", weights_only=False)
+    return ModelScoringEngine(model)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export model embeddings to a memory-mapped store",
+    )
+    parser.add_argument("--model-path", default="app/data/model_epoch_final.pkl")
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Store directory (default: <model path without .pkl>.embeddings/<version>)",
+    )
+    args = parser.parse_args()
+
+    model = torch.load(args.model_path, map_location="cpu", weights_only=False)
+    version = file_version(args.model_path)
+    output = args.output or default_store_path(args.model_path, version)
+    export_embeddings(model, output, version)
+    print(f"Exported {model.num_entities} entity embeddings to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Resolve Neo4j properties for predicted entities with one query per label.
+
+Instead of one follow-up query per predicted node, the nodes that are not
+cached yet are matched by one parameterized ``UNWIND $ids`` query per label,
+run concurrently. Naming the label in the ``MATCH`` lets Neo4j use the label's
+property index; only nodes without a known label are matched label-less, which
+scans every node. Only the configured properties are projected back.
+
+Cached properties are keyed by the graph version, so invalidating the graph
+cache after a data load also retires them.
+"""
+
+import asyncio
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from app.utils.cache import TwoTierCache
+from app.utils.database import AsyncNeo4jConnection
+
+# Labels and property names are interpolated into Cypher, so only plain identifiers are allowed
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class NodeEnricher:
+    """Looks up node properties by ``node_property`` (the mappings' ``Node`` value)."""
+
+    def __init__(
+        self,
+        connection: AsyncNeo4jConnection,
+        cache: TwoTierCache,
+        node_property: str = "id",
+        properties: Sequence[str] = (),
+        graph_version: Optional[Callable[[], Awaitable[str]]] = None,
+    ):
+        for name in (node_property, *properties):
+            if not _IDENTIFIER.match(name):
+                raise ValueError(f"Invalid Neo4j property name '{name}'")
+        self.connection = connection
+        self.cache = cache
+        self.node_property = node_property
+        self.properties = tuple(properties)
+        self.graph_version = graph_version
+        # An empty projection returns every property
+        if self.properties:
+            self._projection = ", ".join(f".`{name}`" for name in self.properties)
+        else:
+            self._projection = ".*"
+        self._key_prefix = f"{node_property}:{','.join(self.properties) or '*'}"
+
+    def _query(self, label: Optional[str]) -> str:
+        node = f"n:`{label}`" if label else "n"
+        return f"""
+        UNWIND $ids AS node_id
+        MATCH ({node} {{`{self.node_property}`: node_id}})
+        RETURN node_id, n {{{self._projection}}} AS properties
+        """
+
+    async def _fetch(self, names: List[str], label: Optional[str]) -> Dict[str, dict]:
+        records = await self.connection.query(
+            self._query(label), parameters={"ids": names}
+        )
+        found: Dict[str, dict] = {}
+        for record in records:
+            found.setdefault(record["node_id"], dict(record["properties"]))
+        return found
+
+    async def enrich(
+        self,
+        names: Sequence[Optional[str]],
+        labels: Sequence[Optional[str]],
+    ) -> List[Optional[dict]]:
+        """Return the properties of each node in ``names`` (``{}`` if not in the graph).
+
+        ``labels`` are the nodes' labels from the mappings; uncached nodes are
+        looked up with one labelled query per label. Nodes that are not found
+        are not cached, so they resolve as soon as they are loaded.
+        """
+        version = await self.graph_version() if self.graph_version else "0"
+        keys = [f"{version}:{self._key_prefix}:{name}" for name in names]
+        properties = await self.cache.get_many(keys)
+        missing = [
+            position
+            for position, value in enumerate(properties)
+            if value is None and names[position] is not None
+        ]
+        if not missing:
+            return properties
+
+        by_label: Dict[Optional[str], Dict[str, None]] = {}
+        for position in missing:
+            label = labels[position]
+            if not label or not _IDENTIFIER.match(label):
+                label = None
+            by_label.setdefault(label, {})[names[position]] = None
+        results = await asyncio.gather(
+            *(self._fetch(list(group), label) for label, group in by_label.items())
+        )
+        found = {name: value for result in results for name, value in result.items()}
+
+        fetched = {}
+        for position in missing:
+            properties[position] = found.get(names[position], {})
+            if properties[position]:
+                fetched[keys[position]] = properties[position]
+        if fetched:
+            await self.cache.set_many(fetched)
+        return properties
@@ -0,0 +1,124 @@
+"""Bounded thread pool that keeps KGE inference off the event loop."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the executor already holds its maximum number of jobs."""
+
+
+class InferenceExecutor:
+    """Runs CPU-heavy scoring in a dedicated, size-limited thread pool.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue_depth``
+    more wait for a thread; further submissions are rejected immediately with
+    ``InferenceQueueFull`` instead of piling up. Each job is awaited for at most
+    ``timeout_seconds``. Torch releases the GIL inside its kernels, so the event
+    loop keeps serving I/O-bound routes while predictions run.
+    """
+
+    def __init__(self, max_workers: int, max_queue_depth: int, timeout_seconds: float):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.timeout_seconds = timeout_seconds
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="kge-inference",
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._queue_seconds = 0.0
+        self._run_seconds = 0.0
+        self._max_run_seconds = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` in the pool and await its result.
+
+        Raises ``InferenceQueueFull`` when the pool is saturated and
+        ``asyncio.TimeoutError`` when the job exceeds the timeout.
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue_depth:
+                self._rejected += 1
+                raise InferenceQueueFull(
+                    f"{self._pending} inference jobs are already queued or running",
+                )
+            self._pending += 1
+            self._submitted += 1
+
+        submitted_at = time.perf_counter()
+        future = self._executor.submit(self._timed, fn, args, submitted_at)
+        # The slot is released when the job really finishes, so a timed-out job
+        # that is still running keeps counting against the queue depth.
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=self.timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            # Jobs that have not started yet are dropped from the queue
+            future.cancel()
+            with self._lock:
+                self._timed_out += 1
+            raise
+
+    def _timed(self, fn: Callable[..., Any], args: tuple, submitted_at: float) -> Any:
+        started_at = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._queue_seconds += started_at - submitted_at
+        try:
+            result = fn(*args)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            with self._lock:
+                self._running -= 1
+                self._run_seconds += elapsed
+                self._max_run_seconds = max(self._max_run_seconds, elapsed)
+        with self._lock:
+            self._completed += 1
+        return result
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of the executor counters."""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+                "timeout_seconds": self.timeout_seconds,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "avg_queue_ms": (self._queue_seconds / finished * 1e3)
+                if finished
+                else 0.0,
+                "avg_run_ms": (self._run_seconds / finished * 1e3) if finished else 0.0,
+                "max_run_ms": self._max_run_seconds * 1e3,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,203 @@
+"""Sparse index of the triples already in the KG, for filtered ranking.
+
+Filtered ranks ignore the other true tails of a (head, relation) pair (or the
+other true heads of a (relation, tail) pair), which would otherwise push the
+queried entity down. Instead of asking Neo4j for the known edges on every
+request, the edges are exported once, mapped to model ids and stored in CSR
+form per direction: a sorted array of ``anchor * num_relations + relation``
+keys, an offsets array, and the concatenated target ids.
+
+Build it offline (from Neo4j, or from a tab-separated head/relation/tail file):
+
+    python -m app.kge.known_triples --from-neo4j
+    python -m app.kge.known_triples --triples-file train.tsv
+"""
+
+import argparse
+import csv
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import torch
+
+from app.kge.relations import NUM_RELATIONS, edge_mapping
+from app.kge.versioning import file_version
+
+
+class KnownTargets:
+    """CSR map from ``(anchor, relation)`` to the sorted ids of known targets."""
+
+    def __init__(self, keys: np.ndarray, offsets: np.ndarray, targets: np.ndarray):
+        self.keys = keys
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def build(
+        cls,
+        anchors: np.ndarray,
+        relations: np.ndarray,
+        targets: np.ndarray,
+    ) -> "KnownTargets":
+        keys = anchors.astype(np.int64) * NUM_RELATIONS + relations.astype(np.int64)
+        order = np.lexsort((targets, keys))
+        keys, targets = keys[order], targets[order]
+
+        # Drop duplicate edges, then record where each key's targets start
+        unique = np.ones(len(keys), dtype=bool)
+        unique[1:] = (keys[1:] != keys[:-1]) | (targets[1:] != targets[:-1])
+        keys, targets = keys[unique], targets[unique]
+        unique_keys, starts = np.unique(keys, return_index=True)
+        offsets = np.append(starts, len(keys)).astype(np.int64)
+        return cls(unique_keys, offsets, targets.astype(np.int32))
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def get(self, anchor: int, relation: int) -> torch.Tensor:
+        """Return the known target ids of ``(anchor, relation)``, ascending."""
+        key = anchor * NUM_RELATIONS + relation
+        position = int(np.searchsorted(self.keys, key))
+        if position == len(self.keys) or self.keys[position] != key:
+            return torch.empty(0, dtype=torch.long)
+        start, stop = self.offsets[position], self.offsets[position + 1]
+        return torch.from_numpy(self.targets[start:stop].astype(np.int64))
+
+
+class KnownTriples:
+    """Known tails per (head, relation) and heads per (tail, relation).
+
+    Tied to the node mappings the triples were mapped with.
+    """
+
+    def __init__(
+        self,
+        tails: KnownTargets,
+        heads: KnownTargets,
+        node_mappings_version: str,
+    ):
+        self.tails = tails
+        self.heads = heads
+        self.node_mappings_version = node_mappings_version
+
+    @classmethod
+    def from_triples(
+        cls,
+        triples: np.ndarray,
+        node_mappings_version: str,
+    ) -> "KnownTriples":
+        """Build from an ``(n, 3)`` array of (head id, relation id, tail id)."""
+        heads, relations, tails = triples[:, 0], triples[:, 1], triples[:, 2]
+        return cls(
+            KnownTargets.build(heads, relations, tails),
+            KnownTargets.build(tails, relations, heads),
+            node_mappings_version,
+        )
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            tail_keys=self.tails.keys,
+            tail_offsets=self.tails.offsets,
+            tail_targets=self.tails.targets,
+            head_keys=self.heads.keys,
+            head_offsets=self.heads.offsets,
+            head_targets=self.heads.targets,
+            node_mappings_version=np.array(self.node_mappings_version),
+        )
+
+    @classmethod
+    def load_if_current(
+        cls,
+        path: str,
+        node_mappings_version: str,
+    ) -> Optional["KnownTriples"]:
+        """Load the index at ``path`` if it was built from the current node mappings."""
+        try:
+            with np.load(path) as data:
+                if str(data["node_mappings_version"]) != node_mappings_version:
+                    return None
+                tails = KnownTargets(
+                    data["tail_keys"],
+                    data["tail_offsets"],
+                    data["tail_targets"],
+                )
+                heads = KnownTargets(
+                    data["head_keys"],
+                    data["head_offsets"],
+                    data["head_targets"],
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+        return cls(tails, heads, node_mappings_version)
+
+
+def _edges_from_tsv(path: str) -> Iterable[Tuple[str, str, str]]:
+    with open(path, newline="") as f:
+        for row in csv.reader(f, delimiter="\t"):
+            if len(row) >= 3:
+                yield row[0], row[1], row[2]
+
+
+def _edges_from_neo4j(node_property: str) -> Iterable[Tuple[str, str, str]]:
+    from app.utils.database import neo4j_connection
+
+    query = f"""
+    MATCH (h)-[r]->(t)
+    RETURN h.{node_property} AS head, type(r) AS relation, t.{node_property} AS tail
+    """
+    # Stream the records instead of materializing every edge at once
+    with neo4j_connection.driver.session() as session:
+        for record in session.run(query):
+            yield record["head"], record["relation"], record["tail"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the known-triples index")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--triples-file", help="Tab-separated head, relation, tail names"
+    )
+    source.add_argument(
+        "--from-neo4j", action="store_true", help="Export every edge from Neo4j"
+    )
+    parser.add_argument(
+        "--node-property",
+        default="id",
+        help="Neo4j node property matching the 'Node' column of the mappings",
+    )
+    parser.add_argument("--node-mappings-path", default="app/data/node_id_final.pkl")
+    parser.add_argument("--output", default="app/data/known_triples.npz")
+    args = parser.parse_args()
+
+    node_mappings = pd.read_pickle(args.node_mappings_path)
+    node_ids = dict(zip(node_mappings["Node"], node_mappings["MappedID"]))
+
+    if args.from_neo4j:
+        edges = _edges_from_neo4j(args.node_property)
+    else:
+        edges = _edges_from_tsv(args.triples_file)
+
+    triples, skipped = [], 0
+    for head, relation, tail in edges:
+        head_id, tail_id = node_ids.get(head), node_ids.get(tail)
+        relation_id = edge_mapping.get(str(relation).lower())
+        if head_id is None or tail_id is None or relation_id is None:
+            skipped += 1
+            continue
+        triples.append((head_id, relation_id, tail_id))
+
+    known_triples = KnownTriples.from_triples(
+        np.asarray(triples, dtype=np.int64).reshape(-1, 3),
+        file_version(args.node_mappings_path),
+    )
+    known_triples.save(args.output)
+    print(
+        f"Indexed {len(known_triples.tails)} known triples "
+        f"({skipped} edges skipped: unmapped node or relation) into {args.output}",
+    )
+
+
+if __name__ == "__main__":
+    main()
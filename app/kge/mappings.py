@@ -0,0 +1,130 @@
+"""Array-backed lookups from model ids to node names and labels."""
+
+import re
+import sys
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import torch
+
+# Columns of node_mappings that may hold each node's label, in order of preference
+LABEL_COLUMNS = ("Label", "label", "NodeType", "node_type", "Type", "type")
+
+
+def find_label_column(node_mappings: pd.DataFrame) -> Optional[str]:
+    """Return the column of ``node_mappings`` holding node labels, if any."""
+    return next(
+        (column for column in LABEL_COLUMNS if column in node_mappings.columns),
+        None,
+    )
+
+
+def normalize_label(label: str) -> str:
+    """Compare labels case- and punctuation-insensitively (ChemicalEntity == chemicalentity)."""
+    return re.sub(r"[^0-9a-z]", "", str(label).lower())
+
+
+class NodeIndex:
+    """Dense ``MappedID -> Node`` table compiled once from ``node_mappings``.
+
+    Names live in an object array indexed by ``MappedID``, so resolving the ids
+    returned by the scoring engine is a single gather instead of a pandas merge
+    per request. Repeated strings are interned to keep the table small. The
+    node labels are kept alongside when the mappings carry them.
+    """
+
+    def __init__(self, names: np.ndarray, labels: Optional[np.ndarray] = None):
+        self._names = names
+        self._labels = labels
+
+    @classmethod
+    def from_frame(
+        cls,
+        node_mappings: pd.DataFrame,
+        id_column: str = "MappedID",
+        name_column: str = "Node",
+    ) -> "NodeIndex":
+        ids = node_mappings[id_column].to_numpy(dtype=np.int64)
+        size = int(ids.max()) + 1 if len(ids) else 0
+        names = np.full(size, None, dtype=object)
+        names[ids] = [
+            sys.intern(name) if isinstance(name, str) else name
+            for name in node_mappings[name_column]
+        ]
+        labels = None
+        label_column = find_label_column(node_mappings)
+        if label_column is not None:
+            labels = np.full(size, None, dtype=object)
+            labels[ids] = [
+                sys.intern(label) if isinstance(label, str) else label
+                for label in node_mappings[label_column]
+            ]
+        return cls(names, labels)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def name(self, mapped_id: int) -> Optional[str]:
+        """Return the node name for ``mapped_id`` or ``None`` if it is unmapped."""
+        if 0 <= mapped_id < len(self._names):
+            return self._names[mapped_id]
+        return None
+
+    def names(self, mapped_ids: Sequence[int]) -> List[Optional[str]]:
+        """Gather the node names for ``mapped_ids``; unmapped ids give ``None``."""
+        ids = np.asarray(mapped_ids, dtype=np.int64)
+        valid = (ids >= 0) & (ids < len(self._names))
+        result = np.full(ids.shape, None, dtype=object)
+        result[valid] = self._names[ids[valid]]
+        return result.tolist()
+
+    def labels(self, mapped_ids: Sequence[int]) -> List[Optional[str]]:
+        """Gather the node labels for ``mapped_ids``; ``None`` if unmapped or unlabeled."""
+        if self._labels is None:
+            return [None] * len(mapped_ids)
+        ids = np.asarray(mapped_ids, dtype=np.int64)
+        valid = (ids >= 0) & (ids < len(self._labels))
+        result = np.full(ids.shape, None, dtype=object)
+        result[valid] = self._labels[ids[valid]]
+        return result.tolist()
+
+
+class LabelIndex:
+    """Sorted MappedIDs of every node label, precomputed from ``node_mappings``.
+
+    Lets scoring and top-K run over the entities of one label only, e.g. the
+    Disease nodes for ``gene_disease``. The id tensors are sorted so positions
+    within a candidate set can be found with ``searchsorted``.
+    """
+
+    def __init__(self, ids_by_label: Dict[str, torch.Tensor]):
+        self._ids_by_label = ids_by_label
+
+    @classmethod
+    def from_frame(
+        cls,
+        node_mappings: pd.DataFrame,
+        id_column: str = "MappedID",
+    ) -> Optional["LabelIndex"]:
+        """Build the index, or return ``None`` if the mappings carry no label column."""
+        label_column = find_label_column(node_mappings)
+        if label_column is None:
+            return None
+
+        labels = node_mappings[label_column].map(normalize_label)
+        ids = node_mappings[id_column].to_numpy(dtype=np.int64)
+        return cls(
+            {
+                label: torch.from_numpy(np.sort(ids[(labels == label).to_numpy()]))
+                for label in labels.unique()
+            },
+        )
+
+    @property
+    def labels(self) -> List[str]:
+        return sorted(self._ids_by_label)
+
+    def ids(self, label: str) -> Optional[torch.Tensor]:
+        """Return the sorted MappedIDs carrying ``label``, or ``None`` if unknown."""
+        return self._ids_by_label.get(normalize_label(label))
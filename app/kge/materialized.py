@@ -0,0 +1,258 @@
+"""Precomputed top-K tail tables for popular (head, relation) pairs.
+
+The table is a directory of ``.npy`` files opened with ``mmap``: sorted
+``head * num_relations + relation`` keys, and the matching rows of top-K tail
+ids and scores, best first. A hit is one ``searchsorted`` and a slice, and the
+rows also answer type-constrained and filtered queries as long as enough of
+their K tails survive the filter.
+
+Build it offline for listed pairs, or for every head of some relations:
+
+    python -m app.kge.materialized --pairs-file popular.tsv --top-k 100
+    python -m app.kge.materialized --relations gene_disease disease_gene
+"""
+
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import torch
+
+from app.kge.embeddings import ENTITY_FILES, open_engine
+from app.kge.mappings import LabelIndex
+from app.kge.relations import NUM_RELATIONS, edge_mapping, relation_domain_labels
+from app.kge.scoring import ScoringEngine, top_k
+from app.kge.versioning import file_version, publish_directory
+from app.utils.environment import CONFIG
+
+KEYS_FILE = "keys.npy"
+IDS_FILE = "ids.npy"
+SCORES_FILE = "scores.npy"
+META_FILE = "meta.json"
+
+
+def default_table_path(model_path: str, model_version: str) -> str:
+    return os.path.join(f"{os.path.splitext(model_path)[0]}.topk", model_version)
+
+
+class TopKTable:
+    """Read-only, memory-mapped top-K tails keyed by (head, relation)."""
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.keys = np.load(os.path.join(directory, KEYS_FILE), mmap_mode="r")
+        self.ids = np.load(os.path.join(directory, IDS_FILE), mmap_mode="r")
+        self.scores = np.load(os.path.join(directory, SCORES_FILE), mmap_mode="r")
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def model_version(self) -> str:
+        return self.meta["model_version"]
+
+    @property
+    def top_k(self) -> int:
+        return self.meta["top_k"]
+
+    @property
+    def precision(self) -> str:
+        return self.meta.get("precision", "fp32")
+
+    @classmethod
+    def open_if_current(
+        cls, directory: str, model_version: str, precision: str = "fp32"
+    ) -> Optional["TopKTable"]:
+        """Return the table in ``directory`` if it was scored from ``model_version`` at ``precision``.
+
+        A table scored at another precision would rank and score differently
+        from live scoring, so it is not used.
+        """
+        try:
+            table = cls(directory)
+        except (OSError, ValueError, KeyError):
+            return None
+        if table.model_version != model_version or table.precision != precision:
+            return None
+        return table
+
+    def lookup(
+        self,
+        head_id: int,
+        relation_id: int,
+        k: int,
+        allowed_ids: Optional[torch.Tensor] = None,
+        excluded_ids: Optional[torch.Tensor] = None,
+    ) -> Optional[Tuple[torch.Tensor, torch.Tensor]]:
+        """Return the top ``k`` ``(tail ids, scores)`` or ``None`` if the table cannot answer.
+
+        ``allowed_ids`` and ``excluded_ids`` filter the stored row; the answer
+        is exact only while at least ``k`` tails remain, or the row already
+        covers every entity.
+        """
+        key = head_id * NUM_RELATIONS + relation_id
+        position = int(np.searchsorted(self.keys, key))
+        result = None
+        if position < len(self.keys) and self.keys[position] == key:
+            ids = torch.from_numpy(self.ids[position].astype(np.int64))
+            scores = torch.from_numpy(np.array(self.scores[position]))
+            keep = torch.ones(len(ids), dtype=torch.bool)
+            if allowed_ids is not None:
+                keep &= torch.isin(ids, allowed_ids)
+            if excluded_ids is not None:
+                keep &= ~torch.isin(ids, excluded_ids)
+            complete = self.top_k >= self.meta["num_entities"]
+            if int(keep.sum()) >= k or complete:
+                result = ids[keep][:k], scores[keep][:k]
+
+        with self._lock:
+            if result is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return result
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self.keys),
+                "top_k": self.top_k,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+def build_table(
+    engine: ScoringEngine,
+    head_ids: np.ndarray,
+    relation_ids: np.ndarray,
+    k: int,
+    directory: str,
+    model_version: str,
+    chunk_size: int = 256,
+) -> int:
+    """Score the pairs ``chunk_size`` rows at a time and write the table; returns its size."""
+    keys = head_ids.astype(np.int64) * NUM_RELATIONS + relation_ids.astype(np.int64)
+    keys, first = np.unique(keys, return_index=True)
+    head_ids, relation_ids = head_ids[first], relation_ids[first]
+    k = min(k, engine.num_entities)
+
+    ids = np.zeros((len(keys), k), dtype=np.int32)
+    scores = np.zeros((len(keys), k), dtype=np.float32)
+    for start in range(0, len(keys), chunk_size):
+        stop = start + chunk_size
+        rows = engine.score_tails(
+            head_ids[start:stop].tolist(), relation_ids[start:stop].tolist()
+        )
+        for offset, row in enumerate(rows):
+            row_ids, row_scores = top_k(row, k)
+            ids[start + offset] = row_ids.numpy()
+            scores[start + offset] = row_scores.numpy()
+
+    meta = {
+        "model_version": model_version,
+        "top_k": k,
+        "num_entities": engine.num_entities,
+        "precision": engine.precision,
+    }
+    # Staged and renamed into place: serving workers may have the old table mapped
+    with publish_directory(directory) as staging:
+        np.save(os.path.join(staging, KEYS_FILE), keys)
+        np.save(os.path.join(staging, IDS_FILE), ids)
+        np.save(os.path.join(staging, SCORES_FILE), scores)
+        with open(os.path.join(staging, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+    return len(keys)
+
+
+def _pairs_from_tsv(path: str) -> List[Tuple[int, int]]:
+    pairs = []
+    with open(path, newline="") as f:
+        for row in csv.reader(f, delimiter="\t"):
+            if len(row) >= 2:
+                pairs.append((int(row[0]), edge_mapping[row[1].lower()]))
+    return pairs
+
+
+def _pairs_for_relations(
+    relations: List[str],
+    num_entities: int,
+    label_index: Optional[LabelIndex],
+) -> List[Tuple[int, int]]:
+    """Every head of each relation: its domain label's entities, or all entities."""
+    pairs = []
+    for relation in relations:
+        relation_id = edge_mapping[relation.lower()]
+        label = relation_domain_labels[relation.lower()]
+        heads = label_index.ids(label) if label_index is not None and label else None
+        if heads is None:
+            heads = torch.arange(num_entities)
+        pairs.extend((head, relation_id) for head in heads.tolist())
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Materialize top-K tails for popular queries"
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--pairs-file", help="Tab-separated head model_id and relation name"
+    )
+    source.add_argument(
+        "--relations", nargs="+", help="Materialize every head of these relations"
+    )
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--model-path", default="app/data/model_epoch_final.pkl")
+    parser.add_argument("--node-mappings-path", default="app/data/node_id_final.pkl")
+    parser.add_argument(
+        "--precision",
+        choices=list(ENTITY_FILES),
+        default=CONFIG.KGE.EMBEDDING_PRECISION,
+        help="Embedding precision to score with; must match the API's (default: KGE_EMBEDDING_PRECISION)",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Table directory (default: <model path without .pkl>.topk/<version>)",
+    )
+    args = parser.parse_args()
+
+    # Reduced precision is only available from the embedding store
+    engine = open_engine(
+        args.model_path, args.precision, require_store=args.precision != "fp32"
+    )
+    if args.pairs_file:
+        pairs = _pairs_from_tsv(args.pairs_file)
+    else:
+        label_index = LabelIndex.from_frame(pd.read_pickle(args.node_mappings_path))
+        pairs = _pairs_for_relations(args.relations, engine.num_entities, label_index)
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+
+    start = time.perf_counter()
+    version = file_version(args.model_path)
+    output = args.output or default_table_path(args.model_path, version)
+    size = build_table(
+        engine,
+        pairs[:, 0],
+        pairs[:, 1],
+        args.top_k,
+        output,
+        version,
+        args.chunk_size,
+    )
+    print(
+        f"Materialized {engine.precision} top-{args.top_k} tails for {size} pairs into {output} in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
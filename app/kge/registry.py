@@ -0,0 +1,205 @@
+"""Versioned KGE model registry with background loading and atomic swaps.
+
+Every request leases the active ``ModelVersion`` for its whole duration, so it
+sees one engine, index, batcher and set of entity mappings even if a new
+version is swapped in meanwhile. A reload builds the next version on a background thread, warms it
+up and then replaces the active reference in one assignment; the previous
+version stays referenced until its last lease is returned, and is released
+only then.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from app.kge.ann import IVFIndex
+from app.kge.batching import MicroBatcher
+from app.kge.known_triples import KnownTriples
+from app.kge.mappings import LabelIndex, NodeIndex
+from app.kge.materialized import TopKTable
+from app.kge.scoring import ScoringEngine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelVersion:
+    """Everything that is tied to one model file and the mappings loaded with it."""
+
+    version: str
+    engine: ScoringEngine
+    precision: str
+    micro_batcher: MicroBatcher
+    node_index: NodeIndex
+    # Versions of the model, mappings and known-triples files this was loaded from
+    source_version: str
+    mappings_version: str
+    label_index: Optional[LabelIndex] = None
+    known_triples: Optional[KnownTriples] = None
+    known_triples_version: Optional[str] = None
+    ann_index: Optional[IVFIndex] = None
+    topk_table: Optional[TopKTable] = None
+    loaded_at: float = field(default_factory=time.time)
+    in_flight: int = 0
+
+    @property
+    def scores_version(self) -> str:
+        """Cache key prefix: scores depend on the model and on their precision, and
+        cached rows carry entity names from the mappings."""
+        return f"{self.version}-{self.precision}-{self.mappings_version}"
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "precision": self.precision,
+            "mappings_version": self.mappings_version,
+            "filtered_ranking": self.known_triples is not None,
+            "engine": type(self.engine).__name__,
+            "approximate_search": self.ann_index is not None,
+            "materialized_entries": len(self.topk_table.keys)
+            if self.topk_table is not None
+            else 0,
+            "loaded_at": self.loaded_at,
+            "in_flight": self.in_flight,
+        }
+
+
+class ModelRegistry:
+    """Holds the active model version and swaps in new ones without downtime.
+
+    ``loader`` builds a ``ModelVersion`` from the files on disk (it runs on a
+    worker thread during reloads), and ``current_version`` cheaply reports
+    their combined version, compared with ``ModelVersion.source_version`` so
+    a reload is skipped while no file has changed.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], ModelVersion],
+        current_version: Callable[[], str],
+    ):
+        self._loader = loader
+        self._current_version = current_version
+        self._lock = threading.Lock()
+        self._reload_lock = asyncio.Lock()
+        self._active = loader()
+        self._retired: List[ModelVersion] = []
+        self._history: List[Dict[str, Any]] = [
+            self._event("loaded", self._active.version)
+        ]
+        self._state = "ready"
+        self._last_error: Optional[str] = None
+
+    @staticmethod
+    def _event(event: str, version: Optional[str], **details: Any) -> Dict[str, Any]:
+        return {"event": event, "version": version, "at": time.time(), **details}
+
+    @property
+    def active(self) -> ModelVersion:
+        return self._active
+
+    @contextmanager
+    def lease(self) -> Iterator[ModelVersion]:
+        """Pin the active version for the duration of one request."""
+        with self._lock:
+            model = self._active
+            model.in_flight += 1
+        try:
+            yield model
+        finally:
+            with self._lock:
+                model.in_flight -= 1
+                drained = model.in_flight == 0 and model in self._retired
+                if drained:
+                    self._retired.remove(model)
+            if drained:
+                self._release(model)
+
+    def _release(self, model: ModelVersion) -> None:
+        logger.info(f"KGE model {model.version} drained and released")
+        with self._lock:
+            self._history.append(self._event("released", model.version))
+
+    async def reload(
+        self,
+        warm_up: Optional[Callable[[ModelVersion], Awaitable[None]]] = None,
+        force: bool = False,
+    ) -> ModelVersion:
+        """Load the model files in the background and swap them in once warmed up.
+
+        Returns the active version; it is unchanged if the files on disk still
+        hold the active version (unless ``force``) or if loading fails, in
+        which case the error is raised after being recorded.
+        """
+        async with self._reload_lock:
+            if (
+                not force
+                and await asyncio.to_thread(self._current_version)
+                == self._active.source_version
+            ):
+                return self._active
+
+            self._state = "loading"
+            started_at = time.perf_counter()
+            try:
+                model = await asyncio.to_thread(self._loader)
+                if warm_up is not None:
+                    await warm_up(model)
+            except Exception as e:
+                self._state = "failed"
+                self._last_error = str(e)
+                with self._lock:
+                    self._history.append(self._event("failed", None, error=str(e)))
+                logger.error(
+                    f"KGE model reload failed; keeping {self._active.version}: {e}"
+                )
+                raise
+
+            with self._lock:
+                previous, self._active = self._active, model
+                if previous.in_flight:
+                    self._retired.append(previous)
+                self._history.append(
+                    self._event(
+                        "activated",
+                        model.version,
+                        previous=previous.version,
+                        load_seconds=round(time.perf_counter() - started_at, 3),
+                    ),
+                )
+            if not previous.in_flight:
+                self._release(previous)
+            self._state = "ready"
+            self._last_error = None
+            logger.info(
+                f"KGE model {model.version} activated, replacing {previous.version}"
+            )
+            return model
+
+    async def watch(
+        self,
+        interval_seconds: float,
+        warm_up: Optional[Callable[[ModelVersion], Awaitable[None]]] = None,
+    ) -> None:
+        """Reload whenever a model file on disk changes; runs until cancelled."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.reload(warm_up)
+            except Exception:
+                # Already logged and recorded; try again on the next change
+                continue
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "last_error": self._last_error,
+                "active": self._active.describe(),
+                "draining": [model.describe() for model in self._retired],
+                "history": list(self._history[-20:]),
+            }
@@ -0,0 +1,133 @@
+"""Relation names accepted by the KGE endpoints and their model relation ids."""
+
+edge_mapping = {
+    "phenotype_chemicalentity": 0,
+    "chemicalentity_phenotype": 0,
+    "mutation_disease": 1,  # reverse relation exists with different ID (40)
+    "molecularfunction_chemicalentity": 2,
+    "chemicalentity_molecularfunction": 2,
+    "disease_anatomy": 3,
+    "anatomy_disease": 3,
+    "chemicalentity_disease": 4,  # reverse relation exists with different ID (39)
+    "disease_disease": 5,
+    "biologicalprocess_gene": 6,  # reverse relation exists with different ID (46)
+    "protein_protein": 7,
+    "gene_phenotype": 8,  # reverse relation exists with different ID (25)
+    "protein_disease": 9,
+    "disease_protein": 9,
+    "anatomy_gene": 10,  # reverse relation exists with different ID (36)
+    "chemicalentity_biologicalprocess": 11,  # reverse relation exists with different ID (57)
+    "disease_gene": 12,  # reverse relation exists with different ID (16)
+    "gene_cellularcomponent": 13,  # reverse relation exists with different ID (15)
+    "chemicalentity_chemicalentity": 14,
+    "cellularcomponent_gene": 15,
+    "gene_disease": 16,
+    "protein_cellularcomponent": 17,
+    "cellularcomponent_protein": 17,
+    "protein_phenotype": 18,
+    "phenotype_protein": 18,
+    "mutation_protein": 19,
+    "protein_mutation": 19,
+    "chemicalentity_gene": 20,  # reverse relation exists with different ID (41)
+    "chemicalentity_tissue": 21,
+    "tissue_chemicalentity": 21,
+    "chemicalentity_protein": 22,
+    "protein_chemicalentity": 22,
+    "biologicalprocess_biologicalprocess": 23,
+    "phenotype_phenotype": 24,
+    "phenotype_gene": 25,
+    "chemicalentity_inhibits_biologicalprocess": 26,
+    "biologicalprocess_inhibits_chemicalentity": 26,  # Assuming "inhibits" stays in middle
+    "gene_inhibits_biologicalprocess": 27,
+    "biologicalprocess_inhibits_gene": 27,  # Assuming "inhibits" stays in middle
+    "protein_biologicalprocess": 28,
+    "biologicalprocess_protein": 28,
+    "gene_promotes_biologicalprocess": 29,
+    "biologicalprocess_promotes_gene": 29,  # Assuming "promotes" stays in middle
+    "gene_molecularfunction": 30,
+    "molecularfunction_gene": 30,
+    "gene_pathway": 31,  # reverse relation exists with different ID (38)
+    "chemicalentity_pathway": 32,
+    "pathway_chemicalentity": 32,
+    "gene_tissue": 33,
+    "tissue_gene": 33,
+    "disease_phenotype": 34,  # reverse relation exists with different ID (37)
+    "chemicalentity_mutation": 35,
+    "mutation_chemicalentity": 35,
+    "gene_anatomy": 36,
+    "phenotype_disease": 37,
+    "pathway_gene": 38,
+    "disease_chemicalentity": 39,
+    "disease_mutation": 40,
+    "gene_chemicalentity": 41,
+    "protein_pathway": 42,
+    "pathway_protein": 42,
+    "gene_protein": 43,
+    "protein_gene": 43,
+    "gene_noeffect_biologicalprocess": 44,
+    "biologicalprocess_noeffect_gene": 44,  # Assuming "noeffect" stays in middle
+    "chemicalentity_promotes_biologicalprocess": 45,
+    "biologicalprocess_promotes_chemicalentity": 45,  # Assuming "promotes" stays in middle
+    "gene_biologicalprocess": 46,
+    "protein_molecularfunction": 47,
+    "molecularfunction_protein": 47,
+    "mutation_gene": 48,  # reverse relation exists with different ID (51)
+    "gene_gene": 49,
+    "molecularfunction_molecularfunction": 50,
+    "gene_mutation": 51,
+    "molecularfunction_biologicalprocess": 52,
+    "biologicalprocess_molecularfunction": 52,
+    "protein_tissue": 53,
+    "tissue_protein": 53,
+    "cellularcomponent_cellularcomponent": 54,
+    "pathway_pathway": 55,
+    "anatomy_anatomy": 56,
+    "biologicalprocess_chemicalentity": 57,
+    "plantextract_chemicalentity": 58,
+    "chemicalentity_plantextract": 58,
+    "plantextract_disease": 59,
+    "disease_plantextract": 59,
+    "pmid_cellularcomponent": 60,
+    "cellularcomponent_pmid": 60,
+    "pmid_chemicalentity": 61,
+    "chemicalentity_pmid": 61,
+    "pmid_disease": 62,
+    "disease_pmid": 62,
+    "pmid_protein": 63,
+    "protein_pmid": 63,
+    "pmid_tissue": 64,
+    "tissue_pmid": 64,
+    "species_associatedwith_nodes": 65,
+    "nodes_associatedwith_species": 65,  # Assuming "associatedwith" stays in middle
+}
+
+
+# Size of the relation id space; keys (anchor, relation) pairs as anchor * NUM_RELATIONS + relation
+NUM_RELATIONS = max(edge_mapping.values()) + 1
+
+
+def get_range_label(relation: str):
+    """Label of the tails of ``relation``: its last token ("gene_disease" -> "disease").
+
+    Returns ``None`` for relations whose tails can be any node type ("..._nodes").
+    """
+    label = relation.lower().rsplit("_", 1)[-1]
+    return None if label == "nodes" else label
+
+
+def get_domain_label(relation: str):
+    """Label of the heads of ``relation``: its first token ("gene_disease" -> "gene").
+
+    Returns ``None`` for relations whose heads can be any node type ("nodes_...").
+    """
+    label = relation.lower().split("_", 1)[0]
+    return None if label == "nodes" else label
+
+
+# Precomputed relation -> range-label and domain-label tables
+relation_range_labels = {
+    relation: get_range_label(relation) for relation in edge_mapping
+}
+relation_domain_labels = {
+    relation: get_domain_label(relation) for relation in edge_mapping
+}
@@ -0,0 +1,292 @@
+"""Vectorized scoring for the PyKEEN model served by ``model_routes``.
+
+``pykeen.predict.predict_target`` scores every entity, wraps the scores in a
+DataFrame and sorts the whole frame before the routes keep only the first few
+rows. The engine below scores all candidates with a single tensor op and picks
+the top K with ``torch.topk``, so the cost of a request no longer includes an
+entity-sized DataFrame and sort.
+"""
+
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence, Tuple
+
+import torch
+from pykeen.typing import LABEL_HEAD, LABEL_TAIL
+
+
+def top_k(scores: torch.Tensor, k: int) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Return ``(ids, scores)`` of the ``k`` highest scores, best first.
+
+    Ties are broken by ascending entity id so the ranking is deterministic,
+    including ties that straddle the K-th position.
+    """
+    k = max(0, min(int(k), scores.shape[-1]))
+    if k == 0:
+        return (
+            torch.empty(0, dtype=torch.long),
+            torch.empty(0, dtype=scores.dtype),
+        )
+
+    threshold = torch.topk(scores, k, sorted=False).values.min()
+    # Candidate ids come back in ascending order, so a stable sort on the
+    # scores keeps the lowest id first among equal scores.
+    candidates = torch.nonzero(scores >= threshold, as_tuple=True)[0]
+    candidate_scores, order = torch.sort(
+        scores[candidates],
+        descending=True,
+        stable=True,
+    )
+    return candidates[order][:k], candidate_scores[:k]
+
+
+def mask_known(
+    scores: torch.Tensor,
+    known_ids: torch.Tensor,
+    candidate_ids: Optional[torch.Tensor] = None,
+    keep_id: Optional[int] = None,
+) -> torch.Tensor:
+    """Return a copy of ``scores`` with known targets set to ``-inf``.
+
+    ``known_ids`` must be sorted entity ids; ``keep_id`` (the target being
+    ranked) is never masked. With ``candidate_ids`` the row covers only those
+    entities and known ids outside the candidate set are ignored.
+    """
+    if keep_id is not None:
+        known_ids = known_ids[known_ids != keep_id]
+    if candidate_ids is None:
+        positions = known_ids
+    else:
+        positions = torch.searchsorted(candidate_ids, known_ids)
+        positions = positions.clamp(max=len(candidate_ids) - 1)
+        positions = positions[candidate_ids[positions] == known_ids]
+    scores = scores.clone()
+    scores[positions] = float("-inf")
+    return scores
+
+
+def top_k_among(
+    scores: torch.Tensor,
+    k: int,
+    candidate_ids: Optional[torch.Tensor] = None,
+    known_ids: Optional[torch.Tensor] = None,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """``top_k`` over a row of candidate scores, returning entity ids.
+
+    ``candidate_ids`` maps each score's position back to its entity id; without
+    it the row covers every entity and positions already are ids. Targets in
+    ``known_ids`` are filtered out first.
+    """
+    if known_ids is not None:
+        scores = mask_known(scores, known_ids, candidate_ids)
+    positions, values = top_k(scores, k)
+    # Masked known targets are never returned, even if fewer than k remain
+    keep = values != float("-inf")
+    positions, values = positions[keep], values[keep]
+    if candidate_ids is None:
+        return positions, values
+    return candidate_ids[positions], values
+
+
+def dense_rank(
+    scores: torch.Tensor,
+    index: int,
+    known_ids: Optional[torch.Tensor] = None,
+    candidate_ids: Optional[torch.Tensor] = None,
+) -> Tuple[int, float, float]:
+    """Return ``(rank, score, max_score)`` for the entity at position ``index``.
+
+    The rank matches ``Series.rank(ascending=False, method="dense")``: one plus
+    the number of distinct scores strictly above the entity's score. Only the
+    scores above it are deduplicated, which is a handful for well-ranked tails.
+    Other entities in ``known_ids`` are masked first, giving a filtered rank;
+    ``candidate_ids`` maps positions to entity ids as in ``top_k_among``.
+    """
+    if known_ids is not None:
+        entity_id = index if candidate_ids is None else int(candidate_ids[index])
+        scores = mask_known(scores, known_ids, candidate_ids, keep_id=entity_id)
+    score = scores[index]
+    higher = scores[scores > score]
+    rank = int(torch.unique(higher).numel()) + 1
+    return rank, float(score), float(scores.max())
+
+
+class ScoringEngine(ABC):
+    """Top-K and rank queries on top of a backend that scores every entity.
+
+    Subclasses provide ``num_entities``, ``score_tails`` and ``score_heads``;
+    everything else is shared so the routes do not care where the scores come
+    from. Queries are ``(anchor, relation)`` pairs where the anchor is the head
+    when predicting tails (``target="tail"``) and the tail when predicting heads
+    (``target="head"``), so both directions go through the same batched path.
+    """
+
+    @property
+    @abstractmethod
+    def num_entities(self) -> int:
+        """Number of entities every ``score_*`` row covers."""
+
+    @property
+    def precision(self) -> str:
+        """Precision of the embeddings the scores are computed from."""
+        return "fp32"
+
+    @abstractmethod
+    def score_tails(
+        self,
+        head_ids: Sequence[int],
+        relation_ids: Sequence[int],
+    ) -> torch.Tensor:
+        """Score every tail for each (head, relation) pair.
+
+        Returns a ``(len(head_ids), num_entities)`` tensor on the CPU.
+        """
+
+    @abstractmethod
+    def score_heads(
+        self,
+        tail_ids: Sequence[int],
+        relation_ids: Sequence[int],
+    ) -> torch.Tensor:
+        """Score every head for each (tail, relation) pair.
+
+        Returns a ``(len(tail_ids), num_entities)`` tensor on the CPU.
+        """
+
+    def score_targets(
+        self,
+        anchor_ids: Sequence[int],
+        relation_ids: Sequence[int],
+        target: str = LABEL_TAIL,
+    ) -> torch.Tensor:
+        """Score every ``target`` entity for each (anchor, relation) pair."""
+        if target == LABEL_HEAD:
+            return self.score_heads(anchor_ids, relation_ids)
+        return self.score_tails(anchor_ids, relation_ids)
+
+    def score_candidates(
+        self,
+        anchor_ids: Sequence[int],
+        relation_ids: Sequence[int],
+        candidate_ids: torch.Tensor,
+        target: str = LABEL_TAIL,
+    ) -> torch.Tensor:
+        """Score only ``candidate_ids`` for each pair; shape ``(pairs, candidates)``."""
+        return self.score_targets(anchor_ids, relation_ids, target)[:, candidate_ids]
+
+    def score(
+        self,
+        anchor_ids: Sequence[int],
+        relation_ids: Sequence[int],
+        candidate_ids: Optional[torch.Tensor] = None,
+        target: str = LABEL_TAIL,
+    ) -> torch.Tensor:
+        """Score every ``target`` entity, or only ``candidate_ids`` when given."""
+        if candidate_ids is None:
+            return self.score_targets(anchor_ids, relation_ids, target)
+        return self.score_candidates(anchor_ids, relation_ids, candidate_ids, target)
+
+    def predict_tail(
+        self,
+        head_id: int,
+        relation_id: int,
+        k: int,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Return the ids and scores of the top ``k`` tails, best first."""
+        scores = self.score_tails([head_id], [relation_id])[0]
+        return top_k(scores, k)
+
+    def predict_tails(
+        self,
+        head_ids: Sequence[int],
+        relation_ids: Sequence[int],
+        ks: Sequence[int],
+        chunk_size: int = 64,
+    ) -> List[Tuple[torch.Tensor, torch.Tensor]]:
+        """Top-K tails for many (head, relation) pairs.
+
+        Pairs are scored ``chunk_size`` rows at a time as one heads x relations
+        matrix against all entities, which keeps the score matrix bounded.
+        """
+        results = []
+        for start in range(0, len(head_ids), chunk_size):
+            stop = start + chunk_size
+            scores = self.score_tails(head_ids[start:stop], relation_ids[start:stop])
+            results.extend(top_k(row, k) for row, k in zip(scores, ks[start:stop]))
+        return results
+
+    def rank_tail(
+        self,
+        head_id: int,
+        relation_id: int,
+        tail_id: int,
+    ) -> Tuple[int, float, float]:
+        """Return the dense rank, score and maximum score for ``tail_id``."""
+        if not 0 <= tail_id < self.num_entities:
+            raise IndexError(f"Tail id {tail_id} is outside the model's entity range")
+        scores = self.score_tails([head_id], [relation_id])[0]
+        return dense_rank(scores, tail_id)
+
+
+class ModelScoringEngine(ScoringEngine):
+    """Scores head and tail queries against every entity of a PyKEEN model."""
+
+    def __init__(self, model):
+        self.model = model
+        self.model.eval()
+
+    @property
+    def num_entities(self) -> int:
+        return self.model.num_entities
+
+    def _predict(
+        self,
+        anchor_ids: Sequence[int],
+        relation_ids: Sequence[int],
+        target: str,
+        ids: Optional[torch.Tensor] = None,
+    ) -> torch.Tensor:
+        # PyKEEN takes (head, relation) rows for tails and (relation, tail) rows for heads
+        if target == LABEL_HEAD:
+            pairs = zip(relation_ids, anchor_ids)
+        else:
+            pairs = zip(anchor_ids, relation_ids)
+        batch = torch.as_tensor(
+            [list(pair) for pair in pairs],
+            dtype=torch.long,
+            device=self.model.device,
+        ).view(-1, 2)
+        if ids is not None:
+            ids = ids.to(self.model.device)
+        with torch.inference_mode():
+            scores = self.model.predict(batch, target=target, full_batch=False, ids=ids)
+        return scores.cpu()
+
+    def score_tails(
+        self,
+        head_ids: Sequence[int],
+        relation_ids: Sequence[int],
+    ) -> torch.Tensor:
+        """Score every tail for each (head, relation) pair.
+
+        The scores are identical to the ones ``predict_target`` reports,
+        including the model's ``predict_with_sigmoid`` setting.
+        """
+        return self._predict(head_ids, relation_ids, LABEL_TAIL)
+
+    def score_heads(
+        self,
+        tail_ids: Sequence[int],
+        relation_ids: Sequence[int],
+    ) -> torch.Tensor:
+        """Score every head for each (tail, relation) pair, as ``predict_target`` would."""
+        return self._predict(tail_ids, relation_ids, LABEL_HEAD)
+
+    def score_candidates(
+        self,
+        anchor_ids: Sequence[int],
+        relation_ids: Sequence[int],
+        candidate_ids: torch.Tensor,
+        target: str = LABEL_TAIL,
+    ) -> torch.Tensor:
+        """Score only ``candidate_ids``; PyKEEN skips the other entities entirely."""
+        return self._predict(anchor_ids, relation_ids, target, ids=candidate_ids)
@@ -0,0 +1,91 @@
+"""Per-worker torch thread budgets and start-up warm-up.
+
+By default every gunicorn/uvicorn worker's torch sizes its intra-op pool to all
+visible cores, and every inference thread of a worker runs such a pool. With
+several workers that oversubscribes the CPU many times over and tail latency
+spikes under load. The budget splits the cores between the worker processes
+and their inference threads instead.
+"""
+
+import logging
+import os
+from typing import Dict, Optional
+
+import torch
+from pykeen.typing import LABEL_HEAD, LABEL_TAIL
+
+from app.kge.scoring import ScoringEngine, top_k
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """Cores this process may run on (respects cgroup/taskset affinity)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def thread_budget(
+    processes: int,
+    inference_threads: int,
+    cpus: Optional[int] = None,
+) -> Dict[str, int]:
+    """Intra-op threads per inference thread, and inter-op threads, for one worker.
+
+    Each of the ``inference_threads`` threads of each of the ``processes``
+    workers gets an equal share of ``cpus`` (at least one thread).
+    """
+    cpus = cpus or available_cpus()
+    per_process = max(1, cpus // max(1, processes))
+    return {
+        "cpus": cpus,
+        "processes": processes,
+        "intra_op_threads": max(1, per_process // max(1, inference_threads)),
+        # Inter-op parallelism only serves torch.jit forks, which scoring does not use
+        "inter_op_threads": 1,
+    }
+
+
+def apply_thread_budget(
+    processes: int,
+    inference_threads: int,
+    intra_op_threads: Optional[int] = None,
+) -> Dict[str, int]:
+    """Size torch's thread pools for this worker and return the budget applied.
+
+    A positive ``intra_op_threads`` overrides the computed share. Must run before the
+    first parallel torch op, as the inter-op pool cannot be resized afterwards.
+    """
+    budget = thread_budget(processes, inference_threads)
+    if intra_op_threads:
+        budget["intra_op_threads"] = intra_op_threads
+    torch.set_num_threads(budget["intra_op_threads"])
+    try:
+        torch.set_num_interop_threads(budget["inter_op_threads"])
+    except RuntimeError:
+        # Already started (e.g. a second import in the same process); keep torch's size
+        budget["inter_op_threads"] = torch.get_num_interop_threads()
+    logger.info(
+        f"Torch thread budget: {budget['intra_op_threads']} intra-op and "
+        f"{budget['inter_op_threads']} inter-op threads "
+        f"({budget['cpus']} CPUs / {processes} workers / {inference_threads} inference threads)",
+    )
+    return budget
+
+
+def warm_up(engine: ScoringEngine, batch_size: int, iterations: int = 3) -> None:
+    """Run dummy queries through the scoring paths the routes use.
+
+    Pages in the embeddings, spins up torch's thread pool and lets the
+    allocator reach its steady state before the worker takes traffic.
+    """
+    anchors = [i % engine.num_entities for i in range(batch_size)]
+    relations = [0] * batch_size
+    candidates = torch.arange(min(engine.num_entities, 1024))
+    with torch.inference_mode():
+        for _ in range(iterations):
+            for target in (LABEL_TAIL, LABEL_HEAD):
+                top_k(engine.score(anchors, relations, target=target)[0], 10)
+                engine.score(anchors[:1], relations[:1], candidates, target)
@@ -0,0 +1,74 @@
+"""Content-addressed version strings for the model files served by the API."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+VERSION_LENGTH = 16
+
+
+def file_version(path: str) -> str:
+    """Return a short SHA-256 digest of the file at ``path``.
+
+    Hashing a large pickle takes a while, so the digest is remembered in a
+    ``<path>.sha256`` sidecar together with the file's size and mtime and only
+    recomputed when either changes. Swapping in a new model file therefore
+    changes the version, and anything keyed by it, automatically.
+    """
+    stat = os.stat(path)
+    sidecar_path = f"{path}.sha256"
+    try:
+        with open(sidecar_path) as f:
+            sidecar = json.load(f)
+        if sidecar["size"] == stat.st_size and sidecar["mtime_ns"] == stat.st_mtime_ns:
+            return sidecar["sha256"][:VERSION_LENGTH]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    try:
+        with open(sidecar_path, "w") as f:
+            json.dump(
+                {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256},
+                f,
+            )
+    except OSError:
+        # A read-only data directory only costs a re-hash on the next start
+        pass
+    return sha256[:VERSION_LENGTH]
+
+
+@contextmanager
+def publish_directory(directory: str) -> Iterator[str]:
+    """Yield a staging directory that atomically becomes ``directory`` on success.
+
+    Workers memory-map the files of published artifacts, and rewriting a
+    mapped file in place changes (or truncates) the pages under them. Files
+    are therefore written to a fresh sibling directory that is renamed into
+    place; a directory already there is renamed aside and deleted, which
+    leaves existing mappings intact.
+    """
+    directory = os.path.abspath(directory)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{os.path.basename(directory)}.", dir=parent)
+    try:
+        yield staging
+        os.chmod(staging, 0o755)
+        retired = f"{staging}.old"
+        if os.path.exists(directory):
+            os.rename(directory, retired)
+        os.rename(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    shutil.rmtree(retired, ignore_errors=True)
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -16,6 +17,7 @@ from app import (
     user_routes,
     utils_routes,
 )
+from app.utils.database import async_neo4j_connection
 from app.utils.environment import CONFIG
 
 
@@ -36,8 +38,34 @@ async def lifespan(app: FastAPI):
 
     redis_connection = redis.from_url(redis_url, encoding="utf-8")
     await FastAPILimiter.init(redis_connection)
+
+    # Open the async Neo4j driver's connection pool for the graph routes
+    await async_neo4j_connection.open()
+
+    # Load the schema catalog the graph routes validate labels and properties against.
+    # It runs in the background so a slow graph cannot stall start-up past the
+    # worker timeout; routes skip validation until the first load completes.
+    schema_watcher = asyncio.create_task(
+        routes.schema_catalog.watch(
+            async_neo4j_connection,
+            routes.graph_cache.graph_version,
+            CONFIG.SCHEMA.POLL_SECONDS,
+        ),
+    )
+
+    # Warm up KGE inference before the worker starts accepting requests
+    await model_routes.warm_up_inference()
+    # Hot-reload the KGE model when a new file is deployed
+    model_watcher = None
+    if CONFIG.KGE.MODEL_POLL_SECONDS > 0:
+        model_watcher = asyncio.create_task(model_routes.watch_model_file())
     yield
     # Shutdown logic (if any) can go here
+    schema_watcher.cancel()
+    if model_watcher is not None:
+        model_watcher.cancel()
+    model_routes.inference_executor.shutdown()
+    await async_neo4j_connection.close()
 
 
 app = FastAPI(
@@ -1,42 +1,79 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
+
 import pandas as pd
 import torch
-from fastapi import APIRouter, HTTPException, Query
-from pykeen import predict
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from pykeen.typing import LABEL_HEAD, LABEL_TAIL
 
+from app.kge.ann import IVFIndex, default_index_path
+from app.kge.batching import MicroBatcher
+from app.kge.embeddings import (
+    EmbeddingScoringEngine,
+    EmbeddingStore,
+    default_store_path,
+)
+from app.kge.enrichment import NodeEnricher
+from app.kge.executor import InferenceExecutor, InferenceQueueFull
+from app.kge.known_triples import KnownTriples
+from app.kge.mappings import LabelIndex, NodeIndex
+from app.kge.materialized import TopKTable, default_table_path
+from app.kge.registry import ModelRegistry, ModelVersion
+from app.kge.relations import (
+    edge_mapping,
+    relation_domain_labels,
+    relation_range_labels,
+)
+from app.kge.scoring import ModelScoringEngine, dense_rank, top_k_among
+from app.kge.threads import apply_thread_budget, warm_up
+from app.kge.versioning import file_version
+from app.routes import graph_cache
+from app.utils.cache import TwoTierCache
+from app.utils.database import async_neo4j_connection, redis_connection
+from app.utils.environment import CONFIG
 from app.utils.schema import (
+    BatchPredictionRequest,
+    BatchPredictionResponse,
+    BatchPredictionResult,
+    HeadPredictionResponse,
+    HeadPredictionResult,
+    ModelReloadRequest,
     PredictionRankResponse,
     PredictionResponse,
     PredictionResult,
 )
+from app.utils.security import get_password_hash, verify_password
+from app.utils.singleflight import SingleFlight
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 # Define the path for data loading
 model_path = "app/data/model_epoch_final.pkl"
 node_mappings_path = "app/data/node_id_final.pkl"
+known_triples_path = "app/data/known_triples.npz"
 
-# Attempt to load the pre-trained PyKEEN model
-try:
-    # Load the model onto the appropriate device
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    kge_model = torch.load(model_path, map_location=device, weights_only=False)
+# Share the CPUs between the server's worker processes and their inference
+# threads; must happen before torch runs anything in parallel
+thread_budget = apply_thread_budget(
+    processes=CONFIG.UVICORN.WORKERS,
+    inference_threads=CONFIG.KGE.INFERENCE_WORKERS,
+    intra_op_threads=CONFIG.KGE.TORCH_THREADS,
+)
 
-except FileNotFoundError:
-    raise FileNotFoundError(
-        f"KGE model file not found. Please ensure '{model_path}' exists.",
-    )
-except Exception as e:
-    raise RuntimeError(f"Error loading KGE model: {e!s}")
-
-# Load the mappings for the entities and relations
-try:
-    node_mappings = pd.read_pickle(node_mappings_path)
-except FileNotFoundError:
-    raise Exception(
-        f"Node mappings file not found. Please ensure {node_mappings_path} exists in the app/data directory.",
-    )
-except Exception as e:
-    raise Exception(f"Error loading node mappings: {e!s}")
+# Dedicated pool for torch work so the event loop keeps serving other routes
+inference_executor = InferenceExecutor(
+    max_workers=CONFIG.KGE.INFERENCE_WORKERS,
+    max_queue_depth=CONFIG.KGE.INFERENCE_QUEUE_DEPTH,
+    timeout_seconds=CONFIG.KGE.INFERENCE_TIMEOUT_SECONDS,
+)
 
 ###Now we fetch info from the database after every prediction which gets more information###
 
@@ -56,107 +93,6 @@ except Exception as e:
 # )
 
 
-edge_mapping = {
-    "phenotype_chemicalentity": 0,
-    "chemicalentity_phenotype": 0,
-    "mutation_disease": 1,  # reverse relation exists with different ID (40)
-    "molecularfunction_chemicalentity": 2,
-    "chemicalentity_molecularfunction": 2,
-    "disease_anatomy": 3,
-    "anatomy_disease": 3,
-    "chemicalentity_disease": 4,  # reverse relation exists with different ID (39)
-    "disease_disease": 5,
-    "biologicalprocess_gene": 6,  # reverse relation exists with different ID (46)
-    "protein_protein": 7,
-    "gene_phenotype": 8,  # reverse relation exists with different ID (25)
-    "protein_disease": 9,
-    "disease_protein": 9,
-    "anatomy_gene": 10,  # reverse relation exists with different ID (36)
-    "chemicalentity_biologicalprocess": 11,  # reverse relation exists with different ID (57)
-    "disease_gene": 12,  # reverse relation exists with different ID (16)
-    "gene_cellularcomponent": 13,  # reverse relation exists with different ID (15)
-    "chemicalentity_chemicalentity": 14,
-    "cellularcomponent_gene": 15,
-    "gene_disease": 16,
-    "protein_cellularcomponent": 17,
-    "cellularcomponent_protein": 17,
-    "protein_phenotype": 18,
-    "phenotype_protein": 18,
-    "mutation_protein": 19,
-    "protein_mutation": 19,
-    "chemicalentity_gene": 20,  # reverse relation exists with different ID (41)
-    "chemicalentity_tissue": 21,
-    "tissue_chemicalentity": 21,
-    "chemicalentity_protein": 22,
-    "protein_chemicalentity": 22,
-    "biologicalprocess_biologicalprocess": 23,
-    "phenotype_phenotype": 24,
-    "phenotype_gene": 25,
-    "chemicalentity_inhibits_biologicalprocess": 26,
-    "biologicalprocess_inhibits_chemicalentity": 26,  # Assuming "inhibits" stays in middle
-    "gene_inhibits_biologicalprocess": 27,
-    "biologicalprocess_inhibits_gene": 27,  # Assuming "inhibits" stays in middle
-    "protein_biologicalprocess": 28,
-    "biologicalprocess_protein": 28,
-    "gene_promotes_biologicalprocess": 29,
-    "biologicalprocess_promotes_gene": 29,  # Assuming "promotes" stays in middle
-    "gene_molecularfunction": 30,
-    "molecularfunction_gene": 30,
-    "gene_pathway": 31,  # reverse relation exists with different ID (38)
-    "chemicalentity_pathway": 32,
-    "pathway_chemicalentity": 32,
-    "gene_tissue": 33,
-    "tissue_gene": 33,
-    "disease_phenotype": 34,  # reverse relation exists with different ID (37)
-    "chemicalentity_mutation": 35,
-    "mutation_chemicalentity": 35,
-    "gene_anatomy": 36,
-    "phenotype_disease": 37,
-    "pathway_gene": 38,
-    "disease_chemicalentity": 39,
-    "disease_mutation": 40,
-    "gene_chemicalentity": 41,
-    "protein_pathway": 42,
-    "pathway_protein": 42,
-    "gene_protein": 43,
-    "protein_gene": 43,
-    "gene_noeffect_biologicalprocess": 44,
-    "biologicalprocess_noeffect_gene": 44,  # Assuming "noeffect" stays in middle
-    "chemicalentity_promotes_biologicalprocess": 45,
-    "biologicalprocess_promotes_chemicalentity": 45,  # Assuming "promotes" stays in middle
-    "gene_biologicalprocess": 46,
-    "protein_molecularfunction": 47,
-    "molecularfunction_protein": 47,
-    "mutation_gene": 48,  # reverse relation exists with different ID (51)
-    "gene_gene": 49,
-    "molecularfunction_molecularfunction": 50,
-    "gene_mutation": 51,
-    "molecularfunction_biologicalprocess": 52,
-    "biologicalprocess_molecularfunction": 52,
-    "protein_tissue": 53,
-    "tissue_protein": 53,
-    "cellularcomponent_cellularcomponent": 54,
-    "pathway_pathway": 55,
-    "anatomy_anatomy": 56,
-    "biologicalprocess_chemicalentity": 57,
-    "plantextract_chemicalentity": 58,
-    "chemicalentity_plantextract": 58,
-    "plantextract_disease": 59,
-    "disease_plantextract": 59,
-    "pmid_cellularcomponent": 60,
-    "cellularcomponent_pmid": 60,
-    "pmid_chemicalentity": 61,
-    "chemicalentity_pmid": 61,
-    "pmid_disease": 62,
-    "disease_pmid": 62,
-    "pmid_protein": 63,
-    "protein_pmid": 63,
-    "pmid_tissue": 64,
-    "tissue_pmid": 64,
-    "species_associatedwith_nodes": 65,
-    "nodes_associatedwith_species": 65,  # Assuming "associatedwith" stays in middle
-}
-
 # def get_NodeID(node: str) -> int:
 #     return node_mappings[node_mappings['Node'] == node]['MappedID'].values[0].item()
 
@@ -169,10 +105,558 @@ def get_EdgeID(edge: str) -> int:
     return edge_mapping[edge.lower()]
 
 
+def check_entity_id(
+    model: ModelVersion, entity_id: int, entity: str, role: str
+) -> None:
+    """Reject ids outside the model so one bad query cannot fail a shared batch."""
+    if not 0 <= entity_id < model.engine.num_entities:
+        raise HTTPException(
+            status_code=404,
+            detail=f"{role.capitalize()} entity '{entity}' not found in predictions.",
+        )
+
+
+def get_candidates(model: ModelVersion, relation: str, target: str = LABEL_TAIL):
+    """Return the sorted MappedIDs that are valid ``target`` entities for ``relation``.
+
+    Tails must carry the relation's range label and heads its domain label;
+    ``None`` means every entity is valid.
+    """
+    if model.label_index is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Type-constrained scoring is not available: the node mappings carry no labels.",
+        )
+    labels = relation_domain_labels if target == LABEL_HEAD else relation_range_labels
+    label = labels[relation.lower()]
+    if label is None:
+        return None
+    candidate_ids = model.label_index.ids(label)
+    if candidate_ids is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No '{label}' entities found in the node mappings.",
+        )
+    return candidate_ids
+
+
+def get_known_targets(
+    model: ModelVersion, anchor_id: int, relation_id: int, target: str = LABEL_TAIL
+) -> torch.Tensor:
+    """Return the sorted MappedIDs already linked to ``anchor_id`` by ``relation_id`` in the KG.
+
+    These are the known tails of a head, or the known heads of a tail.
+    """
+    if model.known_triples is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Filtered ranking is not available: no known-triples index was built for the current node mappings.",
+        )
+    known = (
+        model.known_triples.heads if target == LABEL_HEAD else model.known_triples.tails
+    )
+    return known.get(anchor_id, relation_id)
+
+
+def type_key(relation: str, type_constrained: bool, target: str = LABEL_TAIL) -> str:
+    """Cache key segment naming the candidate label.
+
+    Relation names that share an id (e.g. protein_disease and disease_protein)
+    constrain to different labels, so the id alone cannot key typed results.
+    """
+    if not type_constrained:
+        return "all"
+    labels = relation_domain_labels if target == LABEL_HEAD else relation_range_labels
+    return f"typed-{labels[relation.lower()]}"
+
+
+def filter_key(model: ModelVersion, filtered: bool) -> str:
+    """Cache key segment; filtered results depend on the known-triples snapshot."""
+    return f"filtered-{model.known_triples_version}" if filtered else "raw"
+
+
+async def run_inference(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a scoring call on the inference executor, mapping overload to HTTP errors."""
+    try:
+        return await inference_executor.run(fn, *args)
+    except InferenceQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="The prediction queue is full. Please retry shortly.",
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"Prediction did not finish within {inference_executor.timeout_seconds} seconds.",
+        )
+
+
+def source_version() -> str:
+    """Combined version of every file a ``ModelVersion`` is loaded from."""
+    return ":".join(
+        file_version(path) if os.path.exists(path) else "-"
+        for path in (model_path, node_mappings_path, known_triples_path)
+    )
+
+
+def load_model_version() -> ModelVersion:
+    """Load the model file on disk with its embedding store, IVF index and top-K table.
+
+    The entity mappings and the known-triples index are loaded with it, so a
+    retrained model never serves names or filters from its predecessor.
+    """
+    sources = source_version()
+    try:
+        node_mappings = pd.read_pickle(node_mappings_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"Node mappings file not found. Please ensure {node_mappings_path} exists in the app/data directory.",
+        )
+    except Exception as e:
+        raise RuntimeError(f"Error loading node mappings: {e!s}")
+    mappings_version = file_version(node_mappings_path)
+
+    # Compile the mappings into an array indexed by MappedID for O(1) name lookups
+    node_index = NodeIndex.from_frame(node_mappings)
+
+    # Sorted MappedIDs per node label, used to restrict scoring to valid tail types
+    label_index = LabelIndex.from_frame(node_mappings)
+    if label_index is None:
+        logger.warning(
+            "Node mappings have no label column; type-constrained scoring is disabled"
+        )
+
+    # Known (head, relation) -> tails index for filtered ranking, only if built
+    # from these node mappings; rebuild with `python -m app.kge.known_triples`
+    known_triples = KnownTriples.load_if_current(known_triples_path, mappings_version)
+    if known_triples is None:
+        known_triples_version = None
+        logger.warning(
+            "No current known-triples index found; filtered ranking is disabled"
+        )
+    else:
+        known_triples_version = file_version(known_triples_path)
+
+    try:
+        # Hash of the model file; part of every cache key so a model swap invalidates them
+        version = file_version(model_path)
+
+        # Prefer the memory-mapped embedding store exported from this exact model:
+        # workers share its pages and skip unpickling the model entirely
+        embedding_store = EmbeddingStore.open_if_current(
+            default_store_path(model_path, version),
+            version,
+            CONFIG.KGE.EMBEDDING_PRECISION,
+        )
+        if embedding_store is not None:
+            engine = EmbeddingScoringEngine(embedding_store)
+            precision = embedding_store.precision
+            logger.info(
+                f"Loaded KGE model {version} from the {precision} embedding store"
+            )
+
+            # Optional IVF index for mode=approx, only if built from this model
+            ann_index = IVFIndex.load_if_current(
+                default_index_path(model_path), version
+            )
+        else:
+            ann_index = None
+            precision = "fp32"
+            if CONFIG.KGE.EMBEDDING_PRECISION != "fp32":
+                logger.warning(
+                    f"No current embedding store found; serving the model pickle in fp32 "
+                    f"instead of {CONFIG.KGE.EMBEDDING_PRECISION}",
+                )
+
+            # Load the model onto the appropriate device
+            device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            kge_model = torch.load(model_path, map_location=device, weights_only=False)
+
+            # Scores all candidate tails in one tensor op and selects the top K directly
+            engine = ModelScoringEngine(kge_model)
+
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"KGE model file not found. Please ensure '{model_path}' exists.",
+        )
+    except Exception as e:
+        raise RuntimeError(f"Error loading KGE model: {e!s}")
+
+    if len(node_index) < engine.num_entities:
+        raise RuntimeError(
+            f"Node mappings cover {len(node_index)} ids but the model has "
+            f"{engine.num_entities} entities; they are not from the same training run",
+        )
+
+    # Precomputed top-K tails for popular (head, relation) pairs, if built from this model
+    topk_table = TopKTable.open_if_current(
+        default_table_path(model_path, version), version, precision
+    )
+    if topk_table is not None:
+        logger.info(
+            f"Serving {len(topk_table.keys)} materialized top-{topk_table.top_k} entries"
+        )
+
+    return ModelVersion(
+        version=version,
+        engine=engine,
+        precision=precision,
+        node_index=node_index,
+        source_version=sources,
+        mappings_version=mappings_version,
+        label_index=label_index,
+        known_triples=known_triples,
+        known_triples_version=known_triples_version,
+        ann_index=ann_index,
+        topk_table=topk_table,
+        # Concurrent single-query requests share one forward pass over the entity
+        # table; each version batches separately so a batch never mixes models
+        micro_batcher=MicroBatcher(
+            score_fn=engine.score,
+            run=run_inference,
+            max_batch_size=CONFIG.KGE.MICRO_BATCH_MAX_SIZE,
+            max_wait_ms=CONFIG.KGE.MICRO_BATCH_WAIT_MS,
+        ),
+    )
+
+
+# The active model version; reloads swap in a new one while requests that
+# started on the old one finish against it
+model_registry = ModelRegistry(load_model_version, source_version)
+
+
+async def warm_up_model(model: ModelVersion) -> None:
+    """Warm every inference thread so the first requests do not pay start-up costs."""
+    if CONFIG.KGE.WARMUP_ITERATIONS <= 0:
+        return
+    started_at = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(
+                inference_executor.run(
+                    warm_up,
+                    model.engine,
+                    CONFIG.KGE.MICRO_BATCH_MAX_SIZE,
+                    CONFIG.KGE.WARMUP_ITERATIONS,
+                )
+                for _ in range(inference_executor.max_workers)
+            ),
+        )
+    except Exception as e:
+        logger.warning(f"KGE warm-up of {model.version} failed: {e!s}")
+        return
+    logger.info(
+        f"KGE warm-up of {model.version} finished in {time.perf_counter() - started_at:.2f}s"
+    )
+
+
+async def warm_up_inference() -> None:
+    """Warm up the model version loaded at start-up."""
+    await warm_up_model(model_registry.active)
+
+
+async def watch_model_file() -> None:
+    """Hot-reload the model whenever one of its files changes (KGE_MODEL_POLL_SECONDS)."""
+    await model_registry.watch(CONFIG.KGE.MODEL_POLL_SECONDS, warm_up_model)
+
+
+# Predictions only depend on (model version, direction, anchor, relation, k), so results are
+# cached per worker and shared across workers through Redis
+prediction_cache = TwoTierCache(
+    namespace="kge",
+    max_entries=CONFIG.KGE.CACHE_MAX_ENTRIES,
+    ttl_seconds=CONFIG.KGE.CACHE_TTL_SECONDS,
+    redis_connection=redis_connection if CONFIG.KGE.CACHE_USE_REDIS else None,
+)
+
+
+# Identical predictions requested while one is being computed share its result
+scoring_flights = SingleFlight()
+
+
+# enrich=true resolves predicted nodes' properties with one Neo4j query per label,
+# caching each found node's properties across requests and workers
+node_enricher = NodeEnricher(
+    connection=async_neo4j_connection,
+    cache=TwoTierCache(
+        namespace="kge-nodes",
+        max_entries=CONFIG.KGE.CACHE_MAX_ENTRIES,
+        ttl_seconds=CONFIG.KGE.CACHE_TTL_SECONDS,
+        redis_connection=redis_connection if CONFIG.KGE.CACHE_USE_REDIS else None,
+    ),
+    node_property=CONFIG.KGE.ENRICH_NODE_PROPERTY,
+    properties=CONFIG.KGE.ENRICH_PROPERTIES,
+    # Cached properties are retired with the graph cache, e.g. after a data load
+    graph_version=graph_cache.graph_version,
+)
+
+
+def prediction_rows(
+    model: ModelVersion, target_ids: torch.Tensor, scores: torch.Tensor
+) -> List[list]:
+    """JSON-friendly ``[name, score, id]`` rows, as stored in the prediction cache."""
+    ids = target_ids.tolist()
+    return [list(row) for row in zip(model.node_index.names(ids), scores.tolist(), ids)]
+
+
+async def enrich_rows(model: ModelVersion, rows: List[list]) -> List[Optional[dict]]:
+    """Neo4j properties of every predicted node, fetched with one batched query per label."""
+    ids = [row[2] for row in rows]
+    try:
+        return await node_enricher.enrich(
+            [row[0] for row in rows], model.node_index.labels(ids)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Node enrichment failed: {e!s}")
+
+
+def target_filters(
+    model: ModelVersion,
+    anchor_id: int,
+    relation: str,
+    relation_id: int,
+    mode: str,
+    type_constrained: bool,
+    filtered: bool,
+    target: str = LABEL_TAIL,
+) -> Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]:
+    """Validate a top-K query and return its ``(candidate_ids, known_ids)``."""
+    if mode == "approx" and model.ann_index is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Approximate search is not available: no IVF index was built for the current model.",
+        )
+    candidate_ids = (
+        get_candidates(model, relation, target) if type_constrained else None
+    )
+    known_ids = (
+        get_known_targets(model, anchor_id, relation_id, target) if filtered else None
+    )
+    return candidate_ids, known_ids
+
+
+async def top_k_targets(
+    model: ModelVersion,
+    anchor_id: int,
+    relation_id: int,
+    k: int,
+    mode: str,
+    candidate_ids: Optional[torch.Tensor],
+    known_ids: Optional[torch.Tensor],
+    target: str = LABEL_TAIL,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Top ``k`` target ids and scores, best first, without the prediction cache."""
+    # Popular pairs are answered straight from the materialized table
+    if target == LABEL_TAIL and model.topk_table is not None:
+        materialized = model.topk_table.lookup(
+            anchor_id, relation_id, k, candidate_ids, known_ids
+        )
+        if materialized is not None:
+            return materialized
+
+    if mode == "approx":
+        return await run_inference(
+            model.ann_index.search,
+            model.engine,
+            anchor_id,
+            relation_id,
+            k,
+            CONFIG.KGE.ANN_NPROBE,
+            candidate_ids,
+            known_ids,
+            target,
+        )
+    # Perform prediction, batched with any concurrent requests
+    return await model.micro_batcher.submit(
+        anchor_id,
+        relation_id,
+        partial(
+            top_k_among,
+            k=k,
+            candidate_ids=candidate_ids,
+            known_ids=known_ids,
+        ),
+        candidate_ids,
+        target,
+    )
+
+
+async def predict_targets(
+    model: ModelVersion,
+    anchor_id: int,
+    relation: str,
+    relation_id: int,
+    k: int,
+    mode: str,
+    type_constrained: bool,
+    filtered: bool,
+    target: str = LABEL_TAIL,
+) -> List[list]:
+    """Top ``k`` ``[name, score, id]`` rows for the heads or tails of an anchor and relation.
+
+    Both directions share the scoring engine, micro-batcher and cache.
+    """
+    candidate_ids, known_ids = target_filters(
+        model,
+        anchor_id,
+        relation,
+        relation_id,
+        mode,
+        type_constrained,
+        filtered,
+        target,
+    )
+
+    async def compute_predictions():
+        return prediction_rows(
+            model,
+            *await top_k_targets(
+                model, anchor_id, relation_id, k, mode, candidate_ids, known_ids, target
+            ),
+        )
+
+    key = (
+        f"{model.scores_version}:{target}:{mode}:"
+        f"{type_key(relation, type_constrained, target)}:"
+        f"{filter_key(model, filtered)}:{anchor_id}:{relation_id}:{k}"
+    )
+    return await scoring_flights.do(
+        key,
+        lambda: prediction_cache.get_or_compute(key, compute_predictions),
+    )
+
+
+async def stream_targets(
+    model: ModelVersion,
+    anchor_id: int,
+    relation: str,
+    relation_id: int,
+    k: int,
+    mode: str,
+    type_constrained: bool,
+    filtered: bool,
+    enrich: bool,
+    target: str = LABEL_TAIL,
+) -> StreamingResponse:
+    """Stream the top ``k`` predictions as NDJSON, one ``{entity, score}`` object per line.
+
+    Large K bypasses the prediction cache and the response models: rows are
+    serialized straight from the top-K tensors, ``STREAM_CHUNK_SIZE`` at a time,
+    and enrichment runs one batched Neo4j query per label and chunk.
+    A failure after the stream has started ends it with an ``{"error": ...}``
+    line.
+    """
+    candidate_ids, known_ids = target_filters(
+        model,
+        anchor_id,
+        relation,
+        relation_id,
+        mode,
+        type_constrained,
+        filtered,
+        target,
+    )
+    target_ids, scores = await top_k_targets(
+        model, anchor_id, relation_id, k, mode, candidate_ids, known_ids, target
+    )
+    entity_field = f"{target}_entity"
+
+    async def lines():
+        try:
+            for start in range(0, len(target_ids), CONFIG.KGE.STREAM_CHUNK_SIZE):
+                stop = start + CONFIG.KGE.STREAM_CHUNK_SIZE
+                rows = prediction_rows(
+                    model, target_ids[start:stop], scores[start:stop]
+                )
+                properties = (
+                    await enrich_rows(model, rows) if enrich else [None] * len(rows)
+                )
+                chunk = []
+                for (name, score, _), node_properties in zip(rows, properties):
+                    line = {entity_field: name, "score": score}
+                    if node_properties is not None:
+                        line["properties"] = node_properties
+                    chunk.append(json.dumps(line, default=str))
+                yield "\n".join(chunk) + "\n"
+        except Exception as e:
+            # The 200 status is already sent, so report the failure as the last line
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Prediction stream failed: {detail}")
+            yield json.dumps({"error": detail}) + "\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"X-Model-Version": model.version},
+    )
+
+
+async def rank_target(
+    model: ModelVersion,
+    anchor_id: int,
+    relation: str,
+    relation_id: int,
+    entity_id: int,
+    entity: str,
+    type_constrained: bool,
+    filtered: bool,
+    target: str = LABEL_TAIL,
+) -> List:
+    """Return ``[rank, score, max_score]`` of ``entity_id`` as a head or tail of the anchor."""
+    candidate_ids = (
+        get_candidates(model, relation, target) if type_constrained else None
+    )
+    position = entity_id
+    if candidate_ids is not None:
+        position = int(torch.searchsorted(candidate_ids, entity_id))
+        if position >= len(candidate_ids) or candidate_ids[position] != entity_id:
+            labels = (
+                relation_domain_labels
+                if target == LABEL_HEAD
+                else relation_range_labels
+            )
+            raise HTTPException(
+                status_code=400,
+                detail=f"{target.capitalize()} entity '{entity}' is not a valid '{labels[relation.lower()]}' {target} for relation '{relation}'.",
+            )
+    known_ids = (
+        get_known_targets(model, anchor_id, relation_id, target) if filtered else None
+    )
+
+    async def compute_rank():
+        # Count the distinct scores above the entity instead of ranking every entity
+        return list(
+            await model.micro_batcher.submit(
+                anchor_id,
+                relation_id,
+                partial(
+                    dense_rank,
+                    index=position,
+                    known_ids=known_ids,
+                    candidate_ids=candidate_ids,
+                ),
+                candidate_ids,
+                target,
+            )
+        )
+
+    key = (
+        f"{model.scores_version}:rank:{target}:"
+        f"{type_key(relation, type_constrained, target)}:"
+        f"{filter_key(model, filtered)}:{anchor_id}:{relation_id}:{entity_id}"
+    )
+    return await scoring_flights.do(
+        key,
+        lambda: prediction_cache.get_or_compute(key, compute_rank),
+    )
+
+
 @router.get(
     "/predict_tail",
     tags=["KGE Predictions"],
     response_model=PredictionResponse,
+    response_model_exclude_none=True,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
     description="Predict the top K tail entities given 'model_id' of entities and relation using a PyKEEN KGE model",
     summary="Get top-K tail predictions for a given head and relation",
     operation_id="predict_tail",
@@ -185,46 +669,263 @@ async def predict_tail(
     relation: str = Query(..., description="Relation for the prediction"),
     top_k_predictions: int = Query(
         10,
+        ge=1,
         description="Number of top predictions to return (default is 10)",
     ),
+    mode: Literal["exact", "approx"] = Query(
+        "exact",
+        description="'exact' scores every entity; 'approx' uses the IVF index and only scores the closest clusters",
+    ),
+    type_constrained: bool = Query(
+        False,
+        description="Only score and return tails whose type matches the relation (e.g. Disease for gene_disease)",
+    ),
+    filtered: bool = Query(
+        False,
+        description="Leave out tails already linked to the head by this relation in the KG",
+    ),
+    enrich: bool = Query(
+        False,
+        description="Attach each predicted node's Neo4j properties, fetched with one batched query per node label",
+    ),
+    stream: bool = Query(
+        False,
+        description="Stream the predictions in score order as NDJSON lines instead of one JSON document; suited to very large top_k_predictions",
+    ),
 ):
     """Predict the top K tail entities given a head entity and relation."""
     try:
-        head_id = int(head)
-        relation_id = get_EdgeID(relation)
-
-        # Perform prediction
-        df = predict.predict_target(
-            model=kge_model,
-            head=head_id,
-            relation=relation_id,
-        ).df.head(top_k_predictions)
-
-        df = df.merge(node_mappings, left_on="tail_id", right_on="MappedID", how="left")
-        df = df[["Node", "score"]]
-
-        ###Now we fetch info from the database after every prediction which gets more information###
-
-        # Replace tail names with corresponding Chemicals names using mapping
-        # df["Node"] = df["Node"].apply(
-        #     lambda node: chemical_mapping_dict.get(node, node),
-        # )
-
-        # Format the result for the response
-        predictions = [
-            PredictionResult(tail_entity=tail, score=score)
-            for tail, score in zip(df["Node"], df["score"])
-        ]
-
-        return PredictionResponse(
-            head_entity=head,
-            relation=relation,
-            predictions=predictions,
-        )
+        with model_registry.lease() as model:
+            head_id = int(head)
+            relation_id = get_EdgeID(relation)
+            check_entity_id(model, head_id, head, "head")
+
+            if stream:
+                return await stream_targets(
+                    model,
+                    head_id,
+                    relation,
+                    relation_id,
+                    top_k_predictions,
+                    mode,
+                    type_constrained,
+                    filtered,
+                    enrich,
+                )
+
+            ranked_tails = await predict_targets(
+                model,
+                head_id,
+                relation,
+                relation_id,
+                top_k_predictions,
+                mode,
+                type_constrained,
+                filtered,
+            )
+
+            properties = (
+                await enrich_rows(model, ranked_tails)
+                if enrich
+                else [None] * len(ranked_tails)
+            )
+
+            # Format the result for the response
+            predictions = [
+                PredictionResult(
+                    tail_entity=tail, score=score, properties=node_properties
+                )
+                for (tail, score, _), node_properties in zip(ranked_tails, properties)
+            ]
+
+            return PredictionResponse(
+                head_entity=head,
+                relation=relation,
+                predictions=predictions,
+                model_version=model.version,
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {e!s}")
+
+
+@router.get(
+    "/predict_head",
+    tags=["KGE Predictions"],
+    response_model=HeadPredictionResponse,
+    response_model_exclude_none=True,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+    description="Predict the top K head entities given 'model_id' of the tail entity and relation using a PyKEEN KGE model",
+    summary="Get top-K head predictions for a given tail and relation",
+    operation_id="predict_head",
+)
+async def predict_head(
+    tail: str = Query(
+        ...,
+        description="model_id for the tail entity for the prediction",
+    ),
+    relation: str = Query(..., description="Relation for the prediction"),
+    top_k_predictions: int = Query(
+        10,
+        ge=1,
+        description="Number of top predictions to return (default is 10)",
+    ),
+    mode: Literal["exact", "approx"] = Query(
+        "exact",
+        description="'exact' scores every entity; 'approx' uses the IVF index and only scores the closest clusters",
+    ),
+    type_constrained: bool = Query(
+        False,
+        description="Only score and return heads whose type matches the relation (e.g. Gene for gene_disease)",
+    ),
+    filtered: bool = Query(
+        False,
+        description="Leave out heads already linked to the tail by this relation in the KG",
+    ),
+    enrich: bool = Query(
+        False,
+        description="Attach each predicted node's Neo4j properties, fetched with one batched query per node label",
+    ),
+    stream: bool = Query(
+        False,
+        description="Stream the predictions in score order as NDJSON lines instead of one JSON document; suited to very large top_k_predictions",
+    ),
+):
+    """Predict the top K head entities given a tail entity and relation."""
+    try:
+        with model_registry.lease() as model:
+            tail_id = int(tail)
+            relation_id = get_EdgeID(relation)
+            check_entity_id(model, tail_id, tail, "tail")
+
+            if stream:
+                return await stream_targets(
+                    model,
+                    tail_id,
+                    relation,
+                    relation_id,
+                    top_k_predictions,
+                    mode,
+                    type_constrained,
+                    filtered,
+                    enrich,
+                    LABEL_HEAD,
+                )
+
+            ranked_heads = await predict_targets(
+                model,
+                tail_id,
+                relation,
+                relation_id,
+                top_k_predictions,
+                mode,
+                type_constrained,
+                filtered,
+                LABEL_HEAD,
+            )
+
+            properties = (
+                await enrich_rows(model, ranked_heads)
+                if enrich
+                else [None] * len(ranked_heads)
+            )
+
+            predictions = [
+                HeadPredictionResult(
+                    head_entity=head, score=score, properties=node_properties
+                )
+                for (head, score, _), node_properties in zip(ranked_heads, properties)
+            ]
+
+            return HeadPredictionResponse(
+                tail_entity=tail,
+                relation=relation,
+                predictions=predictions,
+                model_version=model.version,
+            )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {e!s}")
 
 
+@router.post(
+    "/predict_tail_batch",
+    tags=["KGE Predictions"],
+    response_model=BatchPredictionResponse,
+    response_model_exclude_none=True,
+    description="Predict the top K tail entities for a list of (head, relation, k) items in one batched forward pass",
+    summary="Get top-K tail predictions for many heads and relations at once",
+    response_description="Returns one result per item, in request order, with either predictions or an error",
+    operation_id="predict_tail_batch",
+)
+async def predict_tail_batch(request: BatchPredictionRequest):
+    """Predict the top K tails for every item; invalid items are reported individually."""
+    items = request.items
+    if len(items) > CONFIG.KGE.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size {len(items)} exceeds the limit of {CONFIG.KGE.BATCH_MAX_ITEMS} items.",
+        )
+
+    results = [
+        BatchPredictionResult(head_entity=item.head, relation=item.relation)
+        for item in items
+    ]
+
+    with model_registry.lease() as model:
+        # Validate every item up front so one bad item does not fail the batch
+        valid_positions, head_ids, relation_ids, ks = [], [], [], []
+        for position, item in enumerate(items):
+            try:
+                head_id = int(item.head)
+            except ValueError:
+                results[position].error = f"Invalid head model_id '{item.head}'."
+                continue
+            if not 0 <= head_id < model.engine.num_entities:
+                results[
+                    position
+                ].error = f"Head entity '{item.head}' not found in the model."
+                continue
+            try:
+                relation_id = get_EdgeID(item.relation)
+            except KeyError:
+                results[position].error = f"Unknown relation '{item.relation}'."
+                continue
+
+            valid_positions.append(position)
+            head_ids.append(head_id)
+            relation_ids.append(relation_id)
+            ks.append(item.top_k_predictions)
+
+        try:
+            top_k_results = await run_inference(
+                model.engine.predict_tails,
+                head_ids,
+                relation_ids,
+                ks,
+                CONFIG.KGE.BATCH_CHUNK_SIZE,
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Batch prediction failed: {e!s}",
+            )
+
+        for position, (tail_ids, scores) in zip(valid_positions, top_k_results):
+            results[position].predictions = [
+                PredictionResult(tail_entity=tail, score=score)
+                for tail, score in zip(
+                    model.node_index.names(tail_ids.tolist()), scores.tolist()
+                )
+            ]
+
+        return BatchPredictionResponse(results=results, model_version=model.version)
+
+
 @router.get(
     "/get_prediction_rank",
     tags=["KGE Predictions"],
@@ -241,57 +942,180 @@ async def get_prediction_rank(
         ...,
         description="model_id for tail entity to check for its rank",
     ),
+    type_constrained: bool = Query(
+        False,
+        description="Rank the tail only among entities whose type matches the relation",
+    ),
+    filtered: bool = Query(
+        False,
+        description="Ignore the other tails already linked to the head by this relation when ranking",
+    ),
 ):
     """Returns the rank, score of the given tail entity, and the maximum score among predictions."""
     try:
-        # Get IDs for head, relation, and tail
-        head_id = int(head)
-        relation_id = get_EdgeID(relation)
-        tail_id = int(tail)
-
-        # Perform prediction for all tail entities
-        prediction_df = predict.predict_target(
-            model=kge_model,
-            head=head_id,
-            relation=relation_id,
-        ).df
-
-        # Merge the node names into the DataFrame
-        prediction_df = prediction_df.merge(
-            node_mappings,
-            left_on="tail_id",
-            right_on="MappedID",
-            how="left",
-        )
+        with model_registry.lease() as model:
+            # Get IDs for head, relation, and tail
+            head_id = int(head)
+            relation_id = get_EdgeID(relation)
+            tail_id = int(tail)
+            check_entity_id(model, head_id, head, "head")
+            check_entity_id(model, tail_id, tail, "tail")
 
-        # Find the rank, score of the given tail, and max score
-        prediction_df["rank"] = prediction_df["score"].rank(
-            ascending=False,
-            method="dense",
+            tail_rank, tail_score, max_score = await rank_target(
+                model,
+                head_id,
+                relation,
+                relation_id,
+                tail_id,
+                tail,
+                type_constrained,
+                filtered,
+            )
+
+            # Return structured response
+            return PredictionRankResponse(
+                head_entity=head,
+                relation=relation,
+                tail_entity=tail,
+                rank=tail_rank,
+                score=tail_score,
+                max_score=max_score,
+                model_version=model.version,
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Prediction rank calculation failed: {e!s}",
         )
-        tail_row = prediction_df[prediction_df["tail_id"] == tail_id]
 
-        if tail_row.empty:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Tail entity '{tail}' not found in predictions.",
+
+@router.get(
+    "/get_head_prediction_rank",
+    tags=["KGE Predictions"],
+    description="Get the rank and score of a specific head entity for a given tail and relation, along with the maximum score.",
+    summary="Retrieve prediction rank and score for a given head entity",
+    response_description="Returns the rank, score, and maximum score of the prediction",
+    operation_id="get_head_prediction_rank",
+    response_model=PredictionRankResponse,
+)
+async def get_head_prediction_rank(
+    head: str = Query(
+        ...,
+        description="model_id for head entity to check for its rank",
+    ),
+    relation: str = Query(..., description="Relation for the prediction"),
+    tail: str = Query(..., description="model_id for tail entity for the prediction"),
+    type_constrained: bool = Query(
+        False,
+        description="Rank the head only among entities whose type matches the relation",
+    ),
+    filtered: bool = Query(
+        False,
+        description="Ignore the other heads already linked to the tail by this relation when ranking",
+    ),
+):
+    """Returns the rank, score of the given head entity, and the maximum score among head predictions."""
+    try:
+        with model_registry.lease() as model:
+            head_id = int(head)
+            relation_id = get_EdgeID(relation)
+            tail_id = int(tail)
+            check_entity_id(model, head_id, head, "head")
+            check_entity_id(model, tail_id, tail, "tail")
+
+            head_rank, head_score, max_score = await rank_target(
+                model,
+                tail_id,
+                relation,
+                relation_id,
+                head_id,
+                head,
+                type_constrained,
+                filtered,
+                LABEL_HEAD,
             )
 
-        tail_rank = int(tail_row["rank"].iloc[0])
-        tail_score = float(tail_row["score"].iloc[0])
-        max_score = float(prediction_df["score"].max())
-
-        # Return structured response
-        return PredictionRankResponse(
-            head_entity=head,
-            relation=relation,
-            tail_entity=tail,
-            rank=tail_rank,
-            score=tail_score,
-            max_score=max_score,
-        )
+            return PredictionRankResponse(
+                head_entity=head,
+                relation=relation,
+                tail_entity=tail,
+                rank=head_rank,
+                score=head_score,
+                max_score=max_score,
+                model_version=model.version,
+            )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Prediction rank calculation failed: {e!s}",
         )
+
+
+@router.get(
+    "/model_metrics",
+    tags=["KGE Predictions"],
+    response_model=Dict[str, Any],
+    description="Report the active model version and counters for the prediction cache, inference executor and micro-batching scheduler",
+    summary="Get KGE inference metrics",
+    operation_id="get_model_metrics",
+)
+async def get_model_metrics():
+    """Return a snapshot of the KGE serving metrics."""
+    model = model_registry.active
+    return {
+        "model_version": model.version,
+        "precision": model.precision,
+        "threads": thread_budget,
+        "cache": prediction_cache.stats(),
+        "executor": inference_executor.metrics(),
+        "micro_batching": model.micro_batcher.metrics(),
+        "coalescing": scoring_flights.metrics(),
+        "materialized": model.topk_table.metrics()
+        if model.topk_table is not None
+        else None,
+    }
+
+
+@router.get(
+    "/admin/model",
+    tags=["KGE Predictions"],
+    response_model=Dict[str, Any],
+    description="Report the active model version, versions still draining in-flight requests, and the reload history of this worker",
+    summary="Get the KGE model registry status",
+    operation_id="get_model_status",
+)
+async def get_model_status():
+    """Return the model registry status."""
+    return model_registry.status()
+
+
+@router.post(
+    "/admin/model/reload",
+    tags=["KGE Predictions"],
+    response_model=Dict[str, Any],
+    description="Load the model file on disk in the background, warm it up and swap it in without dropping requests. Requires the admin password.",
+    summary="Hot-reload the KGE model",
+    response_description="Returns the model registry status after the reload",
+    operation_id="reload_model",
+)
+async def reload_model(body: ModelReloadRequest):
+    """Swap in the model file on disk; the previous version serves its in-flight requests."""
+    if not CONFIG.ADMIN.PASSWORD or not verify_password(
+        body.admin_password, get_password_hash(CONFIG.ADMIN.PASSWORD)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Incorrect admin password or not authorized",
+        )
+    try:
+        await model_registry.reload(warm_up_model, force=body.force)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Model reload failed; still serving {model_registry.active.version}: {e!s}",
+        )
+    return model_registry.status()
@@ -1,21 +1,122 @@
+import base64
 import re
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.utils.database import Neo4jConnection, get_neo4j_connection
+from app.utils.cache import TwoTierCache
+from app.utils.database import (
+    AsyncNeo4jConnection,
+    async_neo4j_connection,
+    get_async_neo4j_connection,
+    redis_connection,
+)
+from app.utils.environment import CONFIG
+from app.utils.query_cache import GraphQueryCache
 from app.utils.schema import (
     EntityRelationshipsResponse,
+    GraphCacheInvalidateRequest,
     NodeConnection,
     NodeProperties,
     RelatedEntity,
     RelationCheckResponse,
+    SchemaCatalogResponse,
     SubgraphResponse,
     TripleResponse,
 )
+from app.utils.schema_catalog import (
+    SAMPLES_PER_TYPE,
+    SchemaCatalog,
+    sample_triples_query,
+)
+from app.utils.security import get_password_hash, verify_password
 
 router = APIRouter()
 
+RELATIONSHIP_TYPE_QUERY = """
+CALL db.relationshipTypes() YIELD relationshipType
+WITH relationshipType WHERE toLower(relationshipType) = toLower($relType)
+RETURN relationshipType AS relationship_type
+LIMIT 1
+"""
+
+# The KG changes only on data loads, so route results are cached per worker
+# and shared across workers through Redis until the graph version is bumped
+graph_cache = GraphQueryCache(
+    cache=TwoTierCache(
+        namespace="graph",
+        max_entries=CONFIG.GRAPH_CACHE.MAX_ENTRIES,
+        ttl_seconds=CONFIG.GRAPH_CACHE.TTL_SECONDS,
+        redis_connection=redis_connection if CONFIG.GRAPH_CACHE.USE_REDIS else None,
+    ),
+    redis_connection=redis_connection if CONFIG.GRAPH_CACHE.USE_REDIS else None,
+    enabled=CONFIG.GRAPH_CACHE.ENABLED,
+    max_value_bytes=CONFIG.GRAPH_CACHE.MAX_VALUE_BYTES,
+    version_check_seconds=CONFIG.GRAPH_CACHE.VERSION_CHECK_SECONDS,
+)
+
+# Labels, relationship types and property keys of the graph, loaded at start-up
+# and kept in sync with the graph version in the background (see app.main)
+schema_catalog = SchemaCatalog(
+    redis_connection=redis_connection if CONFIG.SCHEMA.USE_REDIS else None,
+    max_age_seconds=CONFIG.SCHEMA.REFRESH_SECONDS,
+)
+
+
+def validating() -> bool:
+    return CONFIG.SCHEMA.VALIDATE and schema_catalog.loaded
+
+
+def did_you_mean(name: str, candidates) -> str:
+    suggestion = schema_catalog.suggest(name, candidates)
+    return f" Did you mean '{suggestion}'?" if suggestion else ""
+
+
+def require_label(label: str) -> None:
+    """Reject labels missing from the graph before they are put into Cypher."""
+    if validating() and not schema_catalog.has_label(label):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown node label '{label}'.{did_you_mean(label, schema_catalog.labels)}",
+        )
+
+
+def require_property(label: str, property_name: str) -> None:
+    """Reject a label, or a property no node with that label has."""
+    require_label(label)
+    if validating() and not schema_catalog.has_property(label, property_name):
+        raise HTTPException(
+            status_code=404,
+            detail=f"No '{label}' node has the property '{property_name}'."
+            f"{did_you_mean(property_name, schema_catalog.property_keys[label])}",
+        )
+
+
+def encode_cursor(element_id: str) -> str:
+    """Opaque page cursor: the last relationship's elementId, base64url-encoded."""
+    return base64.urlsafe_b64encode(element_id.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        element_id = base64.b64decode(
+            cursor.encode(), altchars=b"-_", validate=True
+        ).decode()
+    except (ValueError, UnicodeDecodeError):
+        element_id = ""
+    if not element_id:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor '{cursor}'.")
+    return element_id
+
+
+def require_relationship_type(relationship_type: str) -> None:
+    if validating() and not schema_catalog.has_relationship_type(relationship_type):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown relationship type '{relationship_type}'."
+            f"{did_you_mean(relationship_type, schema_catalog.relationship_types)}",
+        )
+
 
 @router.get(
     "/sample_triples",
@@ -30,25 +131,40 @@ async def get_sample_triples(
         ...,
         description="The relationship type to filter triples. (e.g. GENE_GENE, GENE_DISEASE, GENE_PHENOTYPE)",
     ),
-    db: Neo4jConnection = Depends(get_neo4j_connection),
+    db: AsyncNeo4jConnection = Depends(get_async_neo4j_connection),
 ):
     """Fetch up to 10 sample triples for a given relationship type."""
-    query = """
-    WITH toLower($relType) AS relationshipType
-    CALL apoc.cypher.run(
-        "MATCH (h)-[r]->(t)
-         WHERE toLower(type(r)) = $relationshipType
-         RETURN
-             COALESCE(h.id, h.name, id(h)) AS Head,
-             type(r) AS Relation,
-             COALESCE(t.id, t.name, id(t)) AS Tail
-         LIMIT 10",
-        {relationshipType: relationshipType}
-    ) YIELD value
-    RETURN value.Head AS Head, value.Relation AS Relation, value.Tail AS Tail;
-    """
+    # Resolve the case-insensitive name to the exact type, from the catalog when loaded
+    if schema_catalog.loaded:
+        relationship_type = schema_catalog.relationship_type(rel_type)
+    else:
+        types = await graph_cache.query(
+            db,
+            "get_sample_triples",
+            RELATIONSHIP_TYPE_QUERY,
+            parameters={"relType": rel_type},
+        )
+        relationship_type = types[0]["relationship_type"] if types else None
+    if relationship_type is None:
+        hint = (
+            did_you_mean(rel_type, schema_catalog.relationship_types)
+            if schema_catalog.loaded
+            else ""
+        )
+        raise HTTPException(
+            status_code=404,
+            detail=f"No triples found for relationship type '{rel_type}'.{hint}",
+        )
 
-    result = db.query(query, parameters={"relType": rel_type})
+    # Precomputed with the catalog; types it could not sample take one typed query
+    result = schema_catalog.sample_triples(relationship_type)
+    if result is None:
+        result = await graph_cache.query(
+            db,
+            "get_sample_triples",
+            sample_triples_query(relationship_type),
+            parameters={"limit": SAMPLES_PER_TYPE},
+        )
 
     if not result:
         raise HTTPException(
@@ -79,15 +195,16 @@ async def get_nodes_by_label(
         ...,
         description="The label of the nodes to retrieve (e.g. Gene, Protein, Disease, ChemicalEntity, Phenotype, Tissue, Anatomy, BiologicalProcess, MolecularFunction, CellularComponent, Pathway, Mutation, PMID, Species or PlantExtract)",
     ),
-    db: Neo4jConnection = Depends(get_neo4j_connection),
+    db: AsyncNeo4jConnection = Depends(get_async_neo4j_connection),
 ):
+    require_label(label)
     query = f"""
         MATCH (n:{label})
         RETURN properties(n) AS node_properties
         LIMIT 10
     """
 
-    records = db.query(query)
+    records = await graph_cache.query(db, "get_nodes_by_label", query)
     if not records:
         raise HTTPException(
             status_code=404,
@@ -114,9 +231,17 @@ async def get_subgraph(
     node_label: str = Query(
         ..., description="Label of the start node to search for (e.g., Gene, Protein)"
     ),
-    db: Neo4jConnection = Depends(get_neo4j_connection),
+    per_type: Optional[int] = Query(
+        None,
+        ge=1,
+        le=100,
+        description="Sample up to this many neighbours of each relationship type and return per-type relationship counts; the cost stays bounded on hub nodes",
+    ),
+    db: AsyncNeo4jConnection = Depends(get_async_neo4j_connection),
 ):
     """Retrieve a subgraph of related nodes while limiting the connections to 10."""
+    require_property(node_label, property_name)
+
     # This is done to optimize the query by removing unnecessary properties
     # Makes the query faster and reduces the data transfer
     ignore_properties_source = ["sequence", "seq", "smiles", "detail", "details"]
@@ -129,6 +254,17 @@ async def get_subgraph(
         "description",
     ]
 
+    if per_type is not None:
+        return await sample_subgraph(
+            db,
+            node_label,
+            property_name,
+            property_value,
+            per_type,
+            ignore_properties_source,
+            ignore_properties_target,
+        )
+
     # Construct the MATCH clause using the provided node_label
     match_clause = (
         f"MATCH (n:{node_label} {{{property_name}: $property_value}})-[r]-(connected)"
@@ -145,7 +281,9 @@ async def get_subgraph(
         ]))[0..10] AS connections
     """
 
-    result = db.query(
+    result = await graph_cache.query(
+        db,
+        "get_subgraph",
         query,
         parameters={
             "property_value": property_value,
@@ -181,6 +319,88 @@ async def get_subgraph(
     return SubgraphResponse(source_node=source_node, connections=connections)
 
 
+async def sample_subgraph(
+    db: AsyncNeo4jConnection,
+    node_label: str,
+    property_name: str,
+    property_value: str,
+    per_type: int,
+    ignore_properties_source: List[str],
+    ignore_properties_target: List[str],
+) -> SubgraphResponse:
+    """Up to ``per_type`` neighbours of each relationship type, with per-type counts.
+
+    The counts come from the node's degree per type, and each type is expanded
+    by its own typed ``MATCH`` with the ``LIMIT`` inside it, so a hub costs
+    about as much as a leaf.
+    """
+    # First the source node, its relationship types and their degrees
+    node_query = f"""
+    MATCH (n:{node_label} {{{property_name}: $property_value}})
+    WITH n LIMIT 1
+    RETURN
+        apoc.map.removeKeys(properties(n), $ignore_properties_source) AS node_properties,
+        [rel_type IN apoc.node.relationship.types(n) |
+            [rel_type, apoc.node.degree(n, rel_type)]] AS relationship_counts
+    """
+    nodes = await graph_cache.query(
+        db,
+        "get_subgraph",
+        node_query,
+        parameters={
+            "property_value": property_value,
+            "ignore_properties_source": ignore_properties_source,
+        },
+    )
+    if not nodes or not nodes[0]["relationship_counts"]:
+        raise HTTPException(
+            status_code=404,
+            detail="Node not found or no connections available",
+        )
+    relationship_counts = dict(nodes[0]["relationship_counts"])
+
+    # Then one typed, limited expansion per relationship type
+    expansions = "\n        UNION ALL".join(
+        f"""
+        WITH n
+        MATCH (n)-[r:`{rel_type.replace("`", "``")}`]-(connected)
+        RETURN type(r) AS relationship_type, connected
+        LIMIT $per_type"""
+        for rel_type in sorted(relationship_counts)
+    )
+    sample_query = f"""
+    MATCH (n:{node_label} {{{property_name}: $property_value}})
+    WITH n LIMIT 1
+    CALL {{{expansions}
+    }}
+    RETURN
+        relationship_type,
+        apoc.map.removeKeys(properties(connected), $ignore_properties_target) AS connected_properties
+    """
+    samples = await graph_cache.query(
+        db,
+        "get_subgraph",
+        sample_query,
+        parameters={
+            "property_value": property_value,
+            "per_type": per_type,
+            "ignore_properties_target": ignore_properties_target,
+        },
+    )
+
+    return SubgraphResponse(
+        source_node=NodeProperties(attributes=nodes[0]["node_properties"]),
+        connections=[
+            NodeConnection(
+                relationship_type=sample["relationship_type"],
+                target_node=NodeProperties(attributes=sample["connected_properties"]),
+            )
+            for sample in samples
+        ],
+        relationship_counts=relationship_counts,
+    )
+
+
 @router.get(
     "/search_biological_entities",
     response_model=List[Dict[str, Any]],
@@ -194,7 +414,7 @@ async def search_biological_entities(
         ...,
         description="The name or id or the term to search for in biological entities",
     ),
-    db: Neo4jConnection = Depends(get_neo4j_connection),
+    db: AsyncNeo4jConnection = Depends(get_async_neo4j_connection),
 ):
     """Search biological entities such as Gene, Protein, Disease, ChemicalEntity, Phenotype, Tissue, Anatomy, BiologicalProcess, MolecularFunction, CellularComponent, Pathway, Mutation, PMID, Species or PlantExtract by name or id"""
     # List of properties to exclude for optimization
@@ -232,7 +452,9 @@ async def search_biological_entities(
     RETURN entityType, topEntities;
     """
 
-    result = db.query(
+    result = await graph_cache.query(
+        db,
+        "search_biological_entities",
         query,
         parameters={
             "processed_term": processed_term,
@@ -279,9 +501,32 @@ async def get_entity_relationships(
         None,
         description="The type of relationship to filter by (optional)",
     ),
-    db: Neo4jConnection = Depends(get_neo4j_connection),
+    limit: int = Query(
+        20,
+        ge=1,
+        le=1000,
+        description="Number of related entities per page (default is 20)",
+    ),
+    cursor: Optional[str] = Query(
+        None,
+        description="'next_cursor' of the previous page, to fetch the page after it",
+    ),
+    db: AsyncNeo4jConnection = Depends(get_async_neo4j_connection),
 ):
-    """Fetch related entities, optionally filter by relationship type, and limit details to 20 entities while providing the total count."""
+    """Fetch a page of related entities, optionally filtered by relationship type, with the total count.
+
+    The total is read from the node's stored degree. Paging is not sublinear:
+    Neo4j keeps no per-node order of relationships, so every page still
+    expands all of the entity's relationships (of the named type, if any) and
+    keeps the ``limit`` lowest element ids after the cursor, which is O(degree)
+    per page. What the cursor saves is reading properties, which happens only
+    for the ``limit`` returned entities, and the deep ``SKIP`` of offset paging.
+    """
+    require_property(entity_type, property_name)
+    if relationship_type:
+        require_relationship_type(relationship_type)
+    after = decode_cursor(cursor) if cursor else None
+
     # List of properties to exclude for optimization
     ignore_properties = [
         "sequence",
@@ -292,34 +537,64 @@ async def get_entity_relationships(
         "description",
     ]
 
-    # Define query depending on whether relationship_type is provided
-    if relationship_type:
-        # Apply LOWER() in the query for case-insensitive relationship matching
-        query = f"""
-        MATCH (e:{entity_type})-[r]-(related)
-        WHERE e.{property_name} = $property_value AND LOWER(type(r)) = LOWER($relationship_type)
-        RETURN count(related) AS total_count,
-               collect(apoc.map.removeKeys(properties(related), $ignore_properties))[0..20] AS entity_properties
-        """
-        params = {
-            "property_value": property_value,
-            "relationship_type": relationship_type,
-            "ignore_properties": ignore_properties,
-        }
+    # Name the relationship type in the pattern when it is known exactly, so the
+    # count is read from the degree store and the page expands only that type
+    exact_type = (
+        schema_catalog.relationship_type(relationship_type)
+        if relationship_type
+        else None
+    )
+    page_conditions = ["($cursor IS NULL OR elementId(r) > $cursor)"]
+    if exact_type:
+        rel_type = f":`{exact_type.replace('`', '``')}`"
+        count_pattern = f"(e)-[{rel_type}]-()"
+        page_pattern = f"(e)-[r{rel_type}]-(related)"
+    elif relationship_type:
+        # Catalog not loaded yet: compare type names case-insensitively instead
+        type_condition = "toLower(type(r)) = toLower($relationship_type)"
+        count_pattern = f"(e)-[r]-() WHERE {type_condition}"
+        page_pattern = "(e)-[r]-(related)"
+        page_conditions.append(type_condition)
     else:
-        query = f"""
-        MATCH (e:{entity_type})--(related)
-        WHERE e.{property_name} = $property_value
-        RETURN count(related) AS total_count,
-               collect(apoc.map.removeKeys(properties(related), $ignore_properties))[0..20] AS entity_properties
-        """
-        params = {
-            "property_value": property_value,
-            "ignore_properties": ignore_properties,
-        }
+        count_pattern = "(e)--()"
+        page_pattern = "(e)-[r]-(related)"
+
+    # Keyset pagination: resume after the last relationship of the previous page.
+    # ORDER BY + LIMIT still reads every matching relationship of the entity.
+    query = f"""
+    MATCH (e:{entity_type})
+    WHERE e.{property_name} = $property_value
+    WITH collect(e) AS entities, sum(COUNT {{ {count_pattern} }}) AS total_count
+    CALL {{
+        WITH entities
+        UNWIND entities AS e
+        MATCH {page_pattern}
+        WHERE {" AND ".join(page_conditions)}
+        WITH r, related
+        ORDER BY elementId(r)
+        LIMIT $limit
+        RETURN collect({{
+            cursor: elementId(r),
+            properties: apoc.map.removeKeys(properties(related), $ignore_properties)
+        }}) AS page
+    }}
+    RETURN total_count, page
+    """
+    params = {
+        "property_value": property_value,
+        "relationship_type": relationship_type,
+        "cursor": after,
+        "limit": limit,
+        "ignore_properties": ignore_properties,
+    }
 
     # Execute the query
-    result = db.query(query, parameters=params)
+    result = await graph_cache.query(
+        db,
+        "get_entity_relationships",
+        query,
+        parameters=params,
+    )
 
     if not result:
         relationship_message = (
@@ -332,14 +607,16 @@ async def get_entity_relationships(
 
     # Extract the total count and related entities
     total_count = result[0]["total_count"]
+    page = result[0]["page"]
     related_entities = [
-        RelatedEntity(entity_properties=entity)
-        for entity in result[0]["entity_properties"]
+        RelatedEntity(entity_properties=entity["properties"]) for entity in page
     ]
 
     return EntityRelationshipsResponse(
         total_relationships=total_count,
         related_entities=related_entities,
+        # A full page may have more after it; a short one is the last
+        next_cursor=encode_cursor(page[-1]["cursor"]) if len(page) == limit else None,
     )
 
 
@@ -376,8 +653,15 @@ async def check_relationship(
         ...,
         description="The property value to identify the second entity",
     ),
-    db: Neo4jConnection = Depends(get_neo4j_connection),
+    db: AsyncNeo4jConnection = Depends(get_async_neo4j_connection),
 ):
+    # Entities with an unknown label or property cannot exist, let alone be related
+    if validating() and not (
+        schema_catalog.has_property(entity1_type, entity1_property_name)
+        and schema_catalog.has_property(entity2_type, entity2_property_name)
+    ):
+        return RelationCheckResponse(exists=False)
+
     # Query to check if a relationship exists between the two entities
     query = f"""
     MATCH (e1:{entity1_type})-[r]-(e2:{entity2_type})
@@ -386,7 +670,9 @@ async def check_relationship(
     RETURN type(r) AS relationship_type
     """
 
-    result = db.query(
+    result = await graph_cache.query(
+        db,
+        "check_relationship",
         query,
         parameters={
             "entity1_property_value": entity1_property_value,
@@ -402,3 +688,63 @@ async def check_relationship(
         exists=True,
         relationship_type=result[0]["relationship_type"],
     )
+
+
+@router.get(
+    "/graph_cache_metrics",
+    response_model=Dict[str, Any],
+    description="Report the graph version, the hit ratio and Neo4j time saved by the graph query cache per endpoint, and how many identical in-flight queries were coalesced",
+    summary="Get graph query cache metrics",
+    operation_id="get_graph_cache_metrics",
+)
+async def get_graph_cache_metrics():
+    """Return a snapshot of the graph query cache metrics."""
+    return {
+        **graph_cache.metrics(),
+        "coalescing": async_neo4j_connection.singleflight.metrics(),
+    }
+
+
+@router.post(
+    "/admin/graph_cache/invalidate",
+    response_model=Dict[str, Any],
+    description="Bump the graph version after a data load so every worker stops serving cached graph results. Requires the admin password.",
+    summary="Invalidate the graph query cache",
+    response_description="Returns the new graph version",
+    operation_id="invalidate_graph_cache",
+)
+async def invalidate_graph_cache(body: GraphCacheInvalidateRequest):
+    """Invalidate every cached graph result in all workers."""
+    if not CONFIG.ADMIN.PASSWORD or not verify_password(
+        body.admin_password, get_password_hash(CONFIG.ADMIN.PASSWORD)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Incorrect admin password or not authorized",
+        )
+    try:
+        version = await graph_cache.invalidate()
+    except Exception as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Graph cache invalidation failed: {e!s}",
+        )
+    return {"graph_version": version}
+
+
+@router.get(
+    "/schema",
+    response_model=SchemaCatalogResponse,
+    description="List the graph's node labels, relationship types, property keys per label and indexes, as last loaded from Neo4j",
+    summary="Get the graph schema catalog",
+    response_description="Returns the schema catalog and when it was refreshed",
+    operation_id="get_schema",
+)
+async def get_schema():
+    """Return the schema catalog."""
+    if not schema_catalog.loaded:
+        raise HTTPException(
+            status_code=503,
+            detail="The schema catalog has not been loaded from Neo4j yet.",
+        )
+    return SchemaCatalogResponse(**schema_catalog.as_dict())
@@ -0,0 +1,208 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.utils.database import RedisConnection
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TwoTierCache:
+    """Read-through cache with a bounded in-process LRU in front of Redis.
+
+    The first tier is an ``OrderedDict`` LRU private to the worker. The second
+    tier is shared by every worker through the app's Redis pool, with values
+    stored as JSON under ``<namespace>:<key>`` and an optional TTL. Redis
+    failures are logged and treated as misses so the cache never fails a request.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int,
+        ttl_seconds: Optional[int] = None,
+        redis_connection: Optional[RedisConnection] = None,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis_connection = redis_connection
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local_hits = 0
+        self._redis_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._redis_errors = 0
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _get_local(self, key: str) -> Any:
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _decode(self, payload: Optional[str]) -> Any:
+        """Decode a Redis payload; ``_MISSING`` if absent or not valid JSON."""
+        if payload is None:
+            return _MISSING
+        try:
+            return json.loads(payload)
+        except (TypeError, ValueError) as e:
+            # A corrupt or foreign value under the namespace is only a miss
+            logger.warning(f"Undecodable Redis cache value in {self.namespace}: {e}")
+            with self._lock:
+                self._redis_errors += 1
+            return _MISSING
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key`` or ``None`` on a miss."""
+        value = self._get_local(key)
+        if value is not _MISSING:
+            with self._lock:
+                self._local_hits += 1
+            return value
+
+        if self.redis_connection is not None:
+            try:
+                client = await self.redis_connection.get_connection()
+                payload = await client.get(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"Redis cache read failed for {self.namespace}: {e}")
+                payload = None
+                with self._lock:
+                    self._redis_errors += 1
+            value = self._decode(payload)
+            if value is not _MISSING:
+                self._set_local(key, value)
+                with self._lock:
+                    self._redis_hits += 1
+                return value
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        """Store ``value`` (JSON-serializable) in both tiers."""
+        self._set_local(key, value)
+        if self.redis_connection is None:
+            return
+        try:
+            client = await self.redis_connection.get_connection()
+            await client.set(
+                self._redis_key(key),
+                json.dumps(value),
+                ex=self.ttl_seconds or None,
+            )
+        except Exception as e:
+            logger.warning(f"Redis cache write failed for {self.namespace}: {e}")
+            with self._lock:
+                self._redis_errors += 1
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Return the cached values for ``keys`` in order, ``None`` for misses.
+
+        Keys missing locally are fetched from Redis with a single ``MGET``.
+        """
+        values = [self._get_local(key) for key in keys]
+        remote = [
+            position for position, value in enumerate(values) if value is _MISSING
+        ]
+        with self._lock:
+            self._local_hits += len(keys) - len(remote)
+
+        payloads = [None] * len(remote)
+        if remote and self.redis_connection is not None:
+            try:
+                client = await self.redis_connection.get_connection()
+                payloads = await client.mget([self._redis_key(keys[p]) for p in remote])
+            except Exception as e:
+                logger.warning(f"Redis cache read failed for {self.namespace}: {e}")
+                with self._lock:
+                    self._redis_errors += 1
+
+        for position, payload in zip(remote, payloads):
+            value = self._decode(payload)
+            if value is _MISSING:
+                values[position] = None
+                with self._lock:
+                    self._misses += 1
+                continue
+            values[position] = value
+            self._set_local(keys[position], value)
+            with self._lock:
+                self._redis_hits += 1
+        return values
+
+    async def set_many(self, items: Dict[str, Any]) -> None:
+        """Store every ``key: value`` pair in both tiers, in one Redis pipeline."""
+        for key, value in items.items():
+            self._set_local(key, value)
+        if self.redis_connection is None or not items:
+            return
+        try:
+            client = await self.redis_connection.get_connection()
+            async with client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(
+                        self._redis_key(key),
+                        json.dumps(value),
+                        ex=self.ttl_seconds or None,
+                    )
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis cache write failed for {self.namespace}: {e}")
+            with self._lock:
+                self._redis_errors += 1
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Return the cached value for ``key``, computing and storing it on a miss."""
+        value = await self.get(key)
+        if value is None:
+            value = await compute()
+            await self.set(key, value)
+        return value
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters for both tiers."""
+        with self._lock:
+            lookups = self._local_hits + self._redis_hits + self._misses
+            return {
+                "namespace": self.namespace,
+                "local_entries": len(self._entries),
+                "max_local_entries": self.max_entries,
+                "local_hits": self._local_hits,
+                "redis_hits": self._redis_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "redis_errors": self._redis_errors,
+                "hit_ratio": (
+                    (self._local_hits + self._redis_hits) / lookups if lookups else 0.0
+                ),
+            }
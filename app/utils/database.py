@@ -1,9 +1,12 @@
 # app/database.py
 
+import json
+
 import redis.asyncio as redis
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase, GraphDatabase
 
 from app.utils.environment import CONFIG
+from app.utils.singleflight import SingleFlight
 
 
 class Neo4jConnection:
@@ -37,6 +40,73 @@ def get_neo4j_connection():
     return neo4j_connection
 
 
+class AsyncNeo4jConnection:
+    """Neo4j connection on the async driver, so graph queries do not block the event loop."""
+
+    def __init__(
+        self,
+        uri: str,
+        user: str,
+        password: str,
+        max_connection_pool_size: int = 100,
+        connection_acquisition_timeout: float = 60.0,
+        max_connection_lifetime: float = 3600.0,
+    ):
+        self.uri = uri
+        self.user = user
+        self.password = password
+        self.max_connection_pool_size = max_connection_pool_size
+        self.connection_acquisition_timeout = connection_acquisition_timeout
+        self.max_connection_lifetime = max_connection_lifetime
+        self.driver = None
+        # Identical queries arriving while one runs share its session and result
+        self.singleflight = SingleFlight()
+
+    async def open(self):
+        """Create the driver and its connection pool (called from the app lifespan)."""
+        if self.driver is None:
+            self.driver = AsyncGraphDatabase.driver(
+                self.uri,
+                auth=(self.user, self.password),
+                max_connection_pool_size=self.max_connection_pool_size,
+                connection_acquisition_timeout=self.connection_acquisition_timeout,
+                max_connection_lifetime=self.max_connection_lifetime,
+            )
+
+    async def close(self):
+        """Close the driver and every pooled connection."""
+        if self.driver:
+            await self.driver.close()
+            self.driver = None
+
+    async def query(self, query, parameters=None):
+        key = (query, json.dumps(parameters or {}, sort_keys=True, default=str))
+        return await self.singleflight.do(key, lambda: self._run(query, parameters))
+
+    async def _run(self, query, parameters=None):
+        # Opened lazily too, for callers outside the app lifespan
+        await self.open()
+        async with self.driver.session() as session:
+            result = await session.run(query, parameters)
+            return [record async for record in result]
+
+
+# Global instance (Singleton) for the async Neo4j connection
+async_neo4j_connection = AsyncNeo4jConnection(
+    uri=CONFIG.NEO4J.URI,
+    user=CONFIG.NEO4J.USERNAME,
+    password=CONFIG.NEO4J.PASSWORD,
+    max_connection_pool_size=CONFIG.NEO4J.MAX_CONNECTION_POOL_SIZE,
+    connection_acquisition_timeout=CONFIG.NEO4J.CONNECTION_ACQUISITION_TIMEOUT,
+    max_connection_lifetime=CONFIG.NEO4J.MAX_CONNECTION_LIFETIME,
+)
+
+
+# Dependency injection function for FastAPI routes
+def get_async_neo4j_connection():
+    return async_neo4j_connection
+
+
 # --- Redis Connection ---
 # This class manages the Redis connection pool and provides a method to get a connection.
 # It also includes a method to close the connection pool when needed.
@@ -1,5 +1,5 @@
 # Packages and functions for loading environment variables
-from typing import Optional
+from typing import List, Literal, Optional
 
 from dotenv import find_dotenv, load_dotenv
 from pydantic import EmailStr
@@ -25,6 +25,12 @@ class Neo4jConfig(BaseSettings):
     USERNAME: str
     PASSWORD: str
 
+    # Async driver pool: connections per worker, seconds to wait for a free
+    # connection, and seconds before a pooled connection is replaced
+    MAX_CONNECTION_POOL_SIZE: int = 100
+    CONNECTION_ACQUISITION_TIMEOUT: float = 60.0
+    MAX_CONNECTION_LIFETIME: float = 3600.0
+
     class Config:
         env_prefix = "NEO4J_"
 
@@ -41,6 +47,86 @@ class RedisConfig(BaseSettings):
         env_prefix = "REDIS_"
 
 
+class KGEConfig(BaseSettings):
+    # Maximum number of items accepted by /predict_tail_batch
+    BATCH_MAX_ITEMS: int = 1000
+    # Rows scored per forward pass; bounds the (rows x entities) score matrix
+    BATCH_CHUNK_SIZE: int = 64
+
+    # Threads dedicated to torch inference, and jobs allowed to wait for one
+    INFERENCE_WORKERS: int = 2
+    INFERENCE_QUEUE_DEPTH: int = 32
+    INFERENCE_TIMEOUT_SECONDS: float = 30.0
+
+    # Concurrent requests are collected for up to this window (or batch size)
+    # and scored in one forward pass
+    MICRO_BATCH_WAIT_MS: float = 2.0
+    MICRO_BATCH_MAX_SIZE: int = 32
+
+    # Prediction cache: per-worker LRU size, and the shared Redis tier's TTL
+    CACHE_MAX_ENTRIES: int = 4096
+    CACHE_TTL_SECONDS: int = 86400
+    CACHE_USE_REDIS: bool = True
+
+    # IVF clusters scored per query when predict_tail runs with mode=approx
+    ANN_NPROBE: int = 16
+
+    # Entity table mapped from the embedding store: fp32, fp16 or int8 (per-row scales)
+    EMBEDDING_PRECISION: Literal["fp32", "fp16", "int8"] = "fp32"
+
+    # Intra-op threads per inference thread; 0 splits the CPUs evenly between
+    # UVICORN_WORKERS processes and their inference threads
+    TORCH_THREADS: int = 0
+    # Dummy scoring passes per inference thread at start-up (0 disables warm-up)
+    WARMUP_ITERATIONS: int = 3
+
+    # Predictions per NDJSON chunk (and per enrichment query) when stream=true
+    STREAM_CHUNK_SIZE: int = 1000
+
+    # enrich=true: Neo4j property matching the mappings' Node column, and the
+    # properties returned per predicted node (empty returns all of them)
+    ENRICH_NODE_PROPERTY: str = "id"
+    ENRICH_PROPERTIES: List[str] = []
+
+    # Seconds between checks of the model file for a new version to hot-reload
+    # (0 disables polling; POST /admin/model/reload still works)
+    MODEL_POLL_SECONDS: float = 30.0
+
+    class Config:
+        env_prefix = "KGE_"
+
+
+class GraphCacheConfig(BaseSettings):
+    # Read-through cache of graph route results; per-worker LRU size, and the
+    # shared Redis tier's TTL
+    ENABLED: bool = True
+    MAX_ENTRIES: int = 2048
+    TTL_SECONDS: int = 3600
+    USE_REDIS: bool = True
+    # Results whose JSON is larger than this are served but not cached
+    MAX_VALUE_BYTES: int = 1_000_000
+    # How often each worker re-reads the graph version from Redis
+    VERSION_CHECK_SECONDS: float = 5.0
+
+    class Config:
+        env_prefix = "GRAPH_CACHE_"
+
+
+class SchemaCatalogConfig(BaseSettings):
+    # Reject unknown labels, properties and relationship types before querying Neo4j
+    VALIDATE: bool = True
+    # The catalog is rebuilt when the graph version changes, or once it is older
+    # than this many seconds (0 rebuilds it on graph version changes only)
+    REFRESH_SECONDS: float = 86400.0
+    # How often each worker checks the graph version and the shared catalog
+    POLL_SECONDS: float = 30.0
+    # One worker rebuilds the catalog and shares it with the others through Redis
+    USE_REDIS: bool = True
+
+    class Config:
+        env_prefix = "SCHEMA_"
+
+
 class JWTSettings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
@@ -79,6 +165,9 @@ class CONFIG:
     UVICORN = UvicornConfig()
     NEO4J = Neo4jConfig()
     REDIS = RedisConfig()
+    KGE = KGEConfig()
+    GRAPH_CACHE = GraphCacheConfig()
+    SCHEMA = SchemaCatalogConfig()
     JWT = JWTSettings()
     MAIL = MailConfig()
     ADMIN = AdminSettings()
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from app.utils.cache import TwoTierCache
+from app.utils.database import AsyncNeo4jConnection, RedisConnection
+
+logger = logging.getLogger(__name__)
+
+# Bumped after every data load; part of every cache key so old results are never served
+GRAPH_VERSION_KEY = "graph-version"
+
+
+def normalize_query(query: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+    """Stable digest of a Cypher query and its parameters.
+
+    Whitespace differences and parameter order do not change the digest.
+    """
+    text = re.sub(r"\s+", " ", query).strip()
+    payload = json.dumps([text, parameters or {}], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class GraphQueryCache:
+    """Read-through cache for graph route results, keyed by graph version, endpoint and query.
+
+    Rows are stored with the time Neo4j took to produce them, so every hit
+    adds the latency it saved to the metrics. Results larger than
+    ``max_value_bytes`` are not cached. The graph version is read from Redis
+    at most every ``version_check_seconds``, so an invalidation reaches every
+    worker within that delay.
+    """
+
+    def __init__(
+        self,
+        cache: TwoTierCache,
+        redis_connection: Optional[RedisConnection] = None,
+        enabled: bool = True,
+        max_value_bytes: int = 1_000_000,
+        version_check_seconds: float = 5.0,
+    ):
+        self.cache = cache
+        self.redis_connection = redis_connection
+        self.enabled = enabled
+        self.max_value_bytes = max_value_bytes
+        self.version_check_seconds = version_check_seconds
+        self._version = "0"
+        self._version_checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "neo4j_ms": 0.0, "saved_ms": 0.0},
+        )
+        self._oversized = 0
+
+    def _use_version(self, version: str) -> None:
+        if version != self._version:
+            # Entries of the old version can no longer be hit; free the local tier
+            self.cache.clear_local()
+            self._version = version
+
+    async def graph_version(self) -> str:
+        """Current graph version, refreshed from Redis every ``version_check_seconds``."""
+        now = time.monotonic()
+        if (
+            self.redis_connection is None
+            or now - self._version_checked_at < self.version_check_seconds
+        ):
+            return self._version
+        try:
+            client = await self.redis_connection.get_connection()
+            version = await client.get(GRAPH_VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"Reading the graph version failed: {e}")
+            return self._version
+        self._version_checked_at = now
+        self._use_version(str(version or "0"))
+        return self._version
+
+    async def invalidate(self) -> str:
+        """Start a new graph version, invalidating every cached result in all workers."""
+        if self.redis_connection is not None:
+            client = await self.redis_connection.get_connection()
+            version = str(await client.incr(GRAPH_VERSION_KEY))
+        else:
+            version = str(int(self._version) + 1)
+        self._version_checked_at = time.monotonic()
+        self._use_version(version)
+        return version
+
+    async def query(
+        self,
+        db: AsyncNeo4jConnection,
+        endpoint: str,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the query's records as dicts, from the cache when possible."""
+        if not self.enabled:
+            return [dict(record) for record in await db.query(query, parameters)]
+
+        started_at = time.perf_counter()
+        key = f"{await self.graph_version()}:{endpoint}:{normalize_query(query, parameters)}"
+        entry = await self.cache.get(key)
+        stats = self._endpoints[endpoint]
+        if entry is not None:
+            elapsed_ms = (time.perf_counter() - started_at) * 1e3
+            with self._lock:
+                stats["hits"] += 1
+                stats["saved_ms"] += max(0.0, entry["ms"] - elapsed_ms)
+            return entry["rows"]
+
+        records = await db.query(query, parameters)
+        neo4j_ms = (time.perf_counter() - started_at) * 1e3
+        # Round-trip through JSON so hits and misses return identical values
+        payload = json.dumps([dict(record) for record in records], default=str)
+        rows = json.loads(payload)
+        with self._lock:
+            stats["misses"] += 1
+            stats["neo4j_ms"] += neo4j_ms
+            if len(payload) > self.max_value_bytes:
+                self._oversized += 1
+                return rows
+        await self.cache.set(key, {"rows": rows, "ms": neo4j_ms})
+        return rows
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit ratio and Neo4j time saved, overall and per endpoint."""
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in self._endpoints.items():
+                lookups = stats["hits"] + stats["misses"]
+                endpoints[endpoint] = {
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "hit_ratio": stats["hits"] / lookups if lookups else 0.0,
+                    "avg_neo4j_ms": stats["neo4j_ms"] / stats["misses"]
+                    if stats["misses"]
+                    else 0.0,
+                    "saved_ms": round(stats["saved_ms"], 3),
+                }
+            return {
+                "enabled": self.enabled,
+                "graph_version": self._version,
+                "oversized_results": self._oversized,
+                "saved_ms": round(
+                    sum(stats["saved_ms"] for stats in endpoints.values()), 3
+                ),
+                "endpoints": endpoints,
+                "cache": self.cache.stats(),
+            }
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
 
 
 class TripleResponse(BaseModel):
@@ -20,17 +21,56 @@ class NodeConnection(BaseModel):
 class SubgraphResponse(BaseModel):
     source_node: NodeProperties
     connections: List[NodeConnection]
+    # Relationships of each type on the source node, in per_type sampling mode
+    relationship_counts: Optional[Dict[str, int]] = None
 
 
 class PredictionResult(BaseModel):
     tail_entity: str
     score: float
+    properties: Optional[dict] = None
 
 
 class PredictionResponse(BaseModel):
     head_entity: str
     relation: str
     predictions: List[PredictionResult]
+    model_version: Optional[str] = None
+
+
+class HeadPredictionResult(BaseModel):
+    head_entity: str
+    score: float
+    properties: Optional[dict] = None
+
+
+class HeadPredictionResponse(BaseModel):
+    tail_entity: str
+    relation: str
+    predictions: List[HeadPredictionResult]
+    model_version: Optional[str] = None
+
+
+class BatchPredictionItem(BaseModel):
+    head: str
+    relation: str
+    top_k_predictions: int = Field(10, ge=1)
+
+
+class BatchPredictionRequest(BaseModel):
+    items: List[BatchPredictionItem]
+
+
+class BatchPredictionResult(BaseModel):
+    head_entity: str
+    relation: str
+    predictions: List[PredictionResult] = []
+    error: Optional[str] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchPredictionResult]
+    model_version: Optional[str] = None
 
 
 class PredictionRankResponse(BaseModel):
@@ -40,6 +80,25 @@ class PredictionRankResponse(BaseModel):
     rank: int
     score: float
     max_score: float
+    model_version: Optional[str] = None
+
+
+class SchemaCatalogResponse(BaseModel):
+    labels: List[str]
+    relationship_types: List[str]
+    property_keys: Dict[str, List[str]]
+    indexes: List[dict]
+    refreshed_at: float
+
+
+class GraphCacheInvalidateRequest(BaseModel):
+    admin_password: str
+
+
+class ModelReloadRequest(BaseModel):
+    admin_password: str
+    # Reload even if the model file on disk still has the active version
+    force: bool = False
 
 
 class RelatedEntity(BaseModel):
@@ -49,6 +108,7 @@ class RelatedEntity(BaseModel):
 class EntityRelationshipsResponse(BaseModel):
     total_relationships: int
     related_entities: List[RelatedEntity]
+    next_cursor: Optional[str] = None
 
 
 class RelationCheckResponse(BaseModel):
@@ -0,0 +1,290 @@
+import asyncio
+import difflib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.utils.database import AsyncNeo4jConnection, RedisConnection
+
+logger = logging.getLogger(__name__)
+
+LABELS_QUERY = "CALL db.labels() YIELD label RETURN collect(label) AS labels"
+RELATIONSHIP_TYPES_QUERY = """
+CALL db.relationshipTypes() YIELD relationshipType
+RETURN collect(relationshipType) AS relationship_types
+"""
+NODE_PROPERTIES_QUERY = """
+CALL db.schema.nodeTypeProperties() YIELD nodeLabels, propertyName
+RETURN nodeLabels, propertyName
+"""
+# Triples kept per relationship type for /sample_triples
+SAMPLES_PER_TYPE = 10
+# Typed sample queries run concurrently during a refresh
+SAMPLE_QUERY_CONCURRENCY = 8
+
+# The catalog built by the leader worker, shared with the others through Redis
+CATALOG_KEY = "schema-catalog"
+# Held by the worker rebuilding the catalog; expires if that worker dies
+CATALOG_LOCK_KEY = "schema-catalog:lock"
+CATALOG_LOCK_SECONDS = 300
+
+INDEXES_QUERY = """
+SHOW INDEXES YIELD name, type, entityType, labelsOrTypes, properties, state
+RETURN name, type, entityType, labelsOrTypes, properties, state
+"""
+
+
+def sample_triples_query(relationship_type: str) -> str:
+    """Typed ``MATCH`` for a few triples of one relationship type.
+
+    Naming the type lets Neo4j walk only that type's relationships instead of
+    scanning the whole relationship store.
+    """
+    escaped = relationship_type.replace("`", "``")
+    return f"""
+    MATCH (h)-[r:`{escaped}`]->(t)
+    RETURN
+        COALESCE(h.id, h.name, id(h)) AS Head,
+        type(r) AS Relation,
+        COALESCE(t.id, t.name, id(t)) AS Tail
+    LIMIT $limit
+    """
+
+
+class SchemaCatalog:
+    """Labels, relationship types, property keys per label and indexes of the graph.
+
+    Lets routes reject unknown labels and properties with set lookups instead
+    of letting Neo4j scan the graph for them. Building the catalog reads the
+    property keys of every node, so it is rebuilt only when the graph version
+    changes or the catalog is older than ``max_age_seconds`` (``0`` for no
+    limit). With Redis, one worker rebuilds it under a lock and publishes it,
+    and the other workers load the published copy. Until the first successful
+    load the catalog is empty and ``loaded`` is ``False``; callers should not
+    validate against it then.
+    """
+
+    def __init__(
+        self,
+        redis_connection: Optional[RedisConnection] = None,
+        max_age_seconds: float = 86400.0,
+    ):
+        self.redis_connection = redis_connection
+        self.max_age_seconds = max_age_seconds
+        self.labels: Set[str] = set()
+        self.relationship_types: Set[str] = set()
+        self.property_keys: Dict[str, Set[str]] = {}
+        self.indexes: List[Dict[str, Any]] = []
+        self.refreshed_at: Optional[float] = None
+        self.graph_version: Optional[str] = None
+        self._relationship_types_lower: Dict[str, str] = {}
+        self._sample_triples: Dict[str, List[Dict[str, Any]]] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self.refreshed_at is not None
+
+    def _is_current(
+        self,
+        graph_version: Optional[str],
+        refreshed_at: Optional[float],
+        current_version: str,
+    ) -> bool:
+        if refreshed_at is None or graph_version != current_version:
+            return False
+        return (
+            self.max_age_seconds <= 0
+            or time.time() - refreshed_at < self.max_age_seconds
+        )
+
+    async def sync(self, db: AsyncNeo4jConnection, graph_version: str) -> None:
+        """Bring the catalog up to ``graph_version``, rebuilding it only if nobody has."""
+        if self._is_current(self.graph_version, self.refreshed_at, graph_version):
+            return
+        if self.redis_connection is None:
+            await self.refresh(db, graph_version)
+            return
+
+        try:
+            client = await self.redis_connection.get_connection()
+            shared = await client.get(CATALOG_KEY)
+            payload = json.loads(shared) if shared else None
+            if payload is not None and self._is_current(
+                payload["graph_version"], payload["refreshed_at"], graph_version
+            ):
+                self._apply(payload)
+                return
+            if not await client.set(
+                CATALOG_LOCK_KEY, "1", nx=True, ex=CATALOG_LOCK_SECONDS
+            ):
+                # Another worker is rebuilding it; load its copy on the next poll
+                return
+        except Exception as e:
+            logger.warning(f"Shared schema catalog unavailable; loading it here: {e}")
+            await self.refresh(db, graph_version)
+            return
+
+        try:
+            await self.refresh(db, graph_version)
+            await client.set(CATALOG_KEY, json.dumps(self._payload(), default=str))
+        finally:
+            await client.delete(CATALOG_LOCK_KEY)
+
+    async def refresh(
+        self, db: AsyncNeo4jConnection, graph_version: Optional[str] = None
+    ) -> None:
+        """Rebuild the catalog from Neo4j; on failure the previous catalog stays in place."""
+        labels, relationship_types, node_properties = await asyncio.gather(
+            db.query(LABELS_QUERY),
+            db.query(RELATIONSHIP_TYPES_QUERY),
+            db.query(NODE_PROPERTIES_QUERY),
+        )
+        try:
+            indexes = await db.query(INDEXES_QUERY)
+        except Exception as e:
+            # Listing indexes needs extra privileges; the rest of the catalog still validates
+            logger.warning(f"Could not list Neo4j indexes: {e}")
+            indexes = []
+        property_keys: Dict[str, Set[str]] = {
+            label: set() for label in labels[0]["labels"]
+        }
+        for record in node_properties:
+            if record["propertyName"] is None:
+                continue
+            for label in record["nodeLabels"]:
+                property_keys.setdefault(label, set()).add(record["propertyName"])
+
+        relationship_types = set(relationship_types[0]["relationship_types"])
+        sample_triples = await self._load_sample_triples(db, relationship_types)
+
+        self._apply(
+            {
+                "relationship_types": sorted(relationship_types),
+                "property_keys": {
+                    label: sorted(keys) for label, keys in property_keys.items()
+                },
+                "indexes": [dict(record) for record in indexes],
+                "sample_triples": sample_triples,
+                "refreshed_at": time.time(),
+                "graph_version": graph_version,
+            }
+        )
+        logger.info(
+            f"Schema catalog: {len(self.labels)} labels, {len(self.relationship_types)} "
+            f"relationship types, {len(self.indexes)} indexes",
+        )
+
+    def _payload(self) -> Dict[str, Any]:
+        return {
+            **self.as_dict(),
+            "sample_triples": self._sample_triples,
+            "graph_version": self.graph_version,
+        }
+
+    def _apply(self, payload: Dict[str, Any]) -> None:
+        """Swap in a catalog from ``refresh`` or Redis; readers never see a half-built one."""
+        relationship_types = set(payload["relationship_types"])
+        self.labels = set(payload["property_keys"])
+        self.relationship_types = relationship_types
+        self._relationship_types_lower = {
+            name.lower(): name for name in relationship_types
+        }
+        self._sample_triples = payload["sample_triples"]
+        self.property_keys = {
+            label: set(keys) for label, keys in payload["property_keys"].items()
+        }
+        self.indexes = payload["indexes"]
+        self.graph_version = payload["graph_version"]
+        self.refreshed_at = payload["refreshed_at"]
+
+    async def _load_sample_triples(
+        self,
+        db: AsyncNeo4jConnection,
+        relationship_types: Set[str],
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        semaphore = asyncio.Semaphore(SAMPLE_QUERY_CONCURRENCY)
+
+        async def load(relationship_type: str) -> Optional[List[Dict[str, Any]]]:
+            async with semaphore:
+                try:
+                    records = await db.query(
+                        sample_triples_query(relationship_type),
+                        parameters={"limit": SAMPLES_PER_TYPE},
+                    )
+                except Exception as e:
+                    # Leave this type out; /sample_triples queries Neo4j for it instead
+                    logger.warning(
+                        f"Could not sample relationship type {relationship_type}: {e}"
+                    )
+                    return None
+                return [dict(record) for record in records]
+
+        names = sorted(relationship_types)
+        samples = await asyncio.gather(*(load(name) for name in names))
+        return {
+            name: triples
+            for name, triples in zip(names, samples)
+            if triples is not None
+        }
+
+    async def watch(
+        self,
+        db: AsyncNeo4jConnection,
+        graph_version: Callable[[], Awaitable[str]],
+        poll_seconds: float,
+    ) -> None:
+        """Sync now, then every ``poll_seconds`` until cancelled.
+
+        Meant to run as a background task, so a slow catalog never holds up
+        start-up. A poll on an unchanged graph version costs no Neo4j query.
+        """
+        while True:
+            try:
+                await self.sync(db, await graph_version())
+            except Exception as e:
+                if self.loaded:
+                    logger.warning(
+                        f"Schema catalog refresh failed; keeping the previous one: {e}"
+                    )
+                else:
+                    logger.warning(f"Schema catalog not loaded: {e}")
+            await asyncio.sleep(poll_seconds)
+
+    def has_label(self, label: str) -> bool:
+        return label in self.labels
+
+    def has_property(self, label: str, property_name: str) -> bool:
+        return property_name in self.property_keys.get(label, ())
+
+    def has_relationship_type(self, relationship_type: str) -> bool:
+        """Case-insensitive, as the routes compare relationship types with ``toLower``."""
+        return relationship_type.lower() in self._relationship_types_lower
+
+    def relationship_type(self, name: str) -> Optional[str]:
+        """Exact relationship type for a case-insensitive ``name``, e.g. ``GENE_DISEASE``."""
+        return self._relationship_types_lower.get(name.lower())
+
+    def sample_triples(self, relationship_type: str) -> Optional[List[Dict[str, Any]]]:
+        """Precomputed ``Head``/``Relation``/``Tail`` samples of an exact relationship type."""
+        return self._sample_triples.get(relationship_type)
+
+    def suggest(self, name: str, candidates: Set[str]) -> Optional[str]:
+        """Closest known name, e.g. ``Gene`` for ``gene``."""
+        lowered = {candidate.lower(): candidate for candidate in candidates}
+        if name.lower() in lowered:
+            return lowered[name.lower()]
+        matches = difflib.get_close_matches(name.lower(), lowered, n=1)
+        return lowered[matches[0]] if matches else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "labels": sorted(self.labels),
+            "relationship_types": sorted(self.relationship_types),
+            "property_keys": {
+                label: sorted(keys)
+                for label, keys in sorted(self.property_keys.items())
+            },
+            "indexes": self.indexes,
+            "refreshed_at": self.refreshed_at,
+        }
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one execution.
+
+    The first caller for a key starts the call as a task; callers arriving
+    while it runs await the same task and get the same result (or exception).
+    The key is forgotten as soon as the call finishes, so nothing is cached.
+    Each caller awaits the task through ``asyncio.shield``: a caller that is
+    cancelled does not cancel the call for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._executions = 0
+        self._coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of ``fn()``, shared with concurrent callers of ``key``."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+            with self._lock:
+                self._executions += 1
+        else:
+            with self._lock:
+                self._coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the outcome as retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self._executions + self._coalesced
+            return {
+                "in_flight": len(self._calls),
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+                "coalesced_ratio": self._coalesced / calls if calls else 0.0,
+            }
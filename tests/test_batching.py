@@ -0,0 +1,78 @@
+import asyncio
+
+import torch
+
+from app.kge.batching import MicroBatcher
+
+
+async def run_inline(fn, *args):
+    return fn(*args)
+
+
+def make_batcher(calls, max_batch_size=8, max_wait_ms=5.0):
+    def score_fn(anchor_ids, relation_ids, candidate_ids, target):
+        calls.append((list(anchor_ids), list(relation_ids), target))
+        # Row i holds anchor_i * 10 + relation_i so results are traceable
+        return torch.tensor([[a * 10.0 + r] for a, r in zip(anchor_ids, relation_ids)])
+
+    return MicroBatcher(score_fn, run_inline, max_batch_size, max_wait_ms)
+
+
+def test_concurrent_requests_share_one_forward_pass():
+    calls = []
+
+    async def main():
+        batcher = make_batcher(calls)
+        return await asyncio.gather(
+            *(batcher.submit(a, 1, lambda row: float(row[0])) for a in range(4))
+        ), batcher.metrics()
+
+    results, metrics = asyncio.run(main())
+    assert results == [1.0, 11.0, 21.0, 31.0]
+    assert calls == [([0, 1, 2, 3], [1, 1, 1, 1], "tail")]
+    assert metrics["batches"] == 1
+    assert metrics["requests"] == 4
+
+
+def test_full_queue_flushes_in_max_batch_size_chunks():
+    calls = []
+
+    async def main():
+        batcher = make_batcher(calls, max_batch_size=2, max_wait_ms=1e4)
+        return await asyncio.gather(
+            *(batcher.submit(a, 0, lambda row: float(row[0])) for a in range(4))
+        )
+
+    assert asyncio.run(main()) == [0.0, 10.0, 20.0, 30.0]
+    assert [call[0] for call in calls] == [[0, 1], [2, 3]]
+
+
+def test_targets_are_scored_separately():
+    calls = []
+
+    async def main():
+        batcher = make_batcher(calls)
+        return await asyncio.gather(
+            batcher.submit(1, 0, lambda row: float(row[0]), target="tail"),
+            batcher.submit(2, 0, lambda row: float(row[0]), target="head"),
+        )
+
+    assert asyncio.run(main()) == [10.0, 20.0]
+    assert sorted(call[2] for call in calls) == ["head", "tail"]
+
+
+def test_reducer_error_fails_only_its_request():
+    def fail(row):
+        raise ValueError("bad row")
+
+    async def main():
+        batcher = make_batcher([])
+        return await asyncio.gather(
+            batcher.submit(1, 0, fail),
+            batcher.submit(2, 0, lambda row: float(row[0])),
+            return_exceptions=True,
+        )
+
+    failed, ok = asyncio.run(main())
+    assert isinstance(failed, ValueError)
+    assert ok == 20.0
@@ -0,0 +1,105 @@
+import asyncio
+import os
+
+os.environ.setdefault("NEO4J_USERNAME", "neo4j")
+os.environ.setdefault("NEO4J_PASSWORD", "neo4j")
+os.environ.setdefault("JWT_SECRET_KEY", "test")
+os.environ.setdefault("ADMIN_PASSWORD", "test")
+
+from app.utils.cache import TwoTierCache  # noqa: E402
+
+
+class FakePipeline:
+    def __init__(self, store):
+        self.store = store
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def execute(self):
+        return []
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get_connection(self):
+        return self
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.store)
+
+
+class BrokenRedis:
+    async def get_connection(self):
+        raise ConnectionError("redis is down")
+
+
+def test_local_lru_evicts_least_recently_used():
+    cache = TwoTierCache("t", max_entries=2)
+
+    async def main():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        assert await cache.get("a") == 1
+        await cache.set("c", 3)
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(main()) == [1, None, 3]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_redis_tier_is_shared_between_workers():
+    redis = FakeRedis()
+    writer = TwoTierCache("t", max_entries=4, redis_connection=redis)
+    reader = TwoTierCache("t", max_entries=4, redis_connection=redis)
+
+    async def main():
+        await writer.set_many({"a": [1, 2], "b": {"x": 1}})
+        return await reader.get_many(["a", "missing", "b"]), await reader.get("a")
+
+    many, single = asyncio.run(main())
+    assert many == [[1, 2], None, {"x": 1}]
+    assert single == [1, 2]
+    stats = reader.stats()
+    assert (stats["redis_hits"], stats["local_hits"], stats["misses"]) == (2, 1, 1)
+
+
+def test_undecodable_redis_value_is_a_miss():
+    redis = FakeRedis()
+    redis.store["t:a"] = "{not json"
+    cache = TwoTierCache("t", max_entries=4, redis_connection=redis)
+
+    async def main():
+        return await cache.get("a"), await cache.get_many(["a"])
+
+    assert asyncio.run(main()) == (None, [None])
+    stats = cache.stats()
+    assert stats["misses"] == 2
+    assert stats["redis_errors"] == 2
+
+
+def test_redis_failure_falls_back_to_computing():
+    cache = TwoTierCache("t", max_entries=4, redis_connection=BrokenRedis())
+
+    async def compute():
+        return 42
+
+    assert asyncio.run(cache.get_or_compute("a", compute)) == 42
+    assert cache.stats()["redis_errors"] == 2
@@ -0,0 +1,57 @@
+import numpy as np
+import torch
+
+from app.kge.known_triples import KnownTriples
+from app.kge.scoring import dense_rank, mask_known, top_k_among
+
+TRIPLES = np.array(
+    [
+        [0, 1, 3],
+        [0, 1, 2],
+        [0, 1, 3],
+        [0, 2, 4],
+        [5, 1, 2],
+    ]
+)
+
+
+def test_known_targets_are_sorted_and_deduplicated():
+    known = KnownTriples.from_triples(TRIPLES, "v1")
+    assert known.tails.get(0, 1).tolist() == [2, 3]
+    assert known.tails.get(0, 2).tolist() == [4]
+    assert known.tails.get(1, 1).numel() == 0
+    assert known.heads.get(2, 1).tolist() == [0, 5]
+    assert len(known.tails) == 4
+
+
+def test_index_round_trips_only_for_its_mappings_version(tmp_path):
+    path = str(tmp_path / "known.npz")
+    KnownTriples.from_triples(TRIPLES, "v1").save(path)
+    assert KnownTriples.load_if_current(path, "v1").tails.get(0, 1).tolist() == [2, 3]
+    assert KnownTriples.load_if_current(path, "v2") is None
+    assert KnownTriples.load_if_current(str(tmp_path / "missing.npz"), "v1") is None
+
+
+def test_mask_known_keeps_the_ranked_target():
+    scores = torch.tensor([0.1, 0.2, 0.9, 0.8, 0.3])
+    masked = mask_known(scores, torch.tensor([2, 3]), keep_id=3)
+    assert masked[2] == float("-inf")
+    assert masked[3] == scores[3]
+    assert scores[2] == 0.9
+
+
+def test_mask_known_maps_candidate_positions():
+    candidate_ids = torch.tensor([1, 3, 4, 7])
+    scores = torch.tensor([0.5, 0.6, 0.7, 0.8])
+    masked = mask_known(scores, torch.tensor([2, 3, 7]), candidate_ids)
+    expected = torch.tensor([0.5, float("-inf"), 0.7, float("-inf")])
+    assert torch.equal(masked, expected)
+
+
+def test_filtered_ranking_ignores_other_known_targets():
+    scores = torch.tensor([0.1, 0.2, 0.9, 0.8, 0.3])
+    known_ids = torch.tensor([2, 3])
+    assert dense_rank(scores, 3)[0] == 2
+    assert dense_rank(scores, 3, known_ids)[0] == 1
+    ids, _ = top_k_among(scores, 5, known_ids=known_ids)
+    assert ids.tolist() == [4, 1, 0]
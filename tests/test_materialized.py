@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import torch
+
+os.environ.setdefault("NEO4J_USERNAME", "neo4j")
+os.environ.setdefault("NEO4J_PASSWORD", "neo4j")
+os.environ.setdefault("JWT_SECRET_KEY", "test")
+os.environ.setdefault("ADMIN_PASSWORD", "test")
+
+from app.kge.materialized import TopKTable, build_table  # noqa: E402
+from app.kge.scoring import ScoringEngine  # noqa: E402
+
+NUM_ENTITIES = 6
+
+
+class FixedScores(ScoringEngine):
+    """Scores tail ``t`` of head ``h`` as ``-|t - h|``, so ``h`` ranks first."""
+
+    @property
+    def num_entities(self) -> int:
+        return NUM_ENTITIES
+
+    def score_tails(self, head_ids, relation_ids):
+        tails = torch.arange(NUM_ENTITIES, dtype=torch.float32)
+        return torch.stack([-(tails - head).abs() for head in head_ids])
+
+    def score_heads(self, tail_ids, relation_ids):
+        return self.score_tails(tail_ids, relation_ids)
+
+
+def build(tmp_path, k):
+    directory = str(tmp_path / "table")
+    build_table(
+        FixedScores(),
+        np.array([2, 4, 2]),
+        np.array([1, 0, 1]),
+        k,
+        directory,
+        "model-v1",
+    )
+    return directory
+
+
+def test_lookup_returns_stored_row(tmp_path):
+    table = TopKTable.open_if_current(build(tmp_path, 4), "model-v1")
+    ids, scores = table.lookup(2, 1, 3)
+    # Ties at distance 1 go to the lower id
+    assert ids.tolist() == [2, 1, 3]
+    assert scores.tolist() == [0.0, -1.0, -1.0]
+    assert table.lookup(3, 1, 3) is None
+    assert table.metrics()["entries"] == 2
+    assert (table.metrics()["hits"], table.metrics()["misses"]) == (1, 1)
+
+
+def test_lookup_filters_and_misses_when_too_few_tails_survive(tmp_path):
+    table = TopKTable.open_if_current(build(tmp_path, 4), "model-v1")
+    ids, _ = table.lookup(4, 0, 2, allowed_ids=torch.tensor([2, 3, 5]))
+    assert ids.tolist() == [3, 5]
+    ids, _ = table.lookup(4, 0, 2, excluded_ids=torch.tensor([4]))
+    assert ids.tolist() == [3, 5]
+    assert table.lookup(4, 0, 3, allowed_ids=torch.tensor([3, 5])) is None
+
+
+def test_complete_row_answers_any_filter(tmp_path):
+    table = TopKTable.open_if_current(build(tmp_path, NUM_ENTITIES), "model-v1")
+    ids, _ = table.lookup(4, 0, 3, allowed_ids=torch.tensor([0, 1]))
+    assert ids.tolist() == [1, 0]
+
+
+def test_open_if_current_rejects_other_versions_and_precisions(tmp_path):
+    directory = build(tmp_path, 4)
+    assert TopKTable.open_if_current(directory, "model-v2") is None
+    assert TopKTable.open_if_current(directory, "model-v1", "fp16") is None
+    assert TopKTable.open_if_current(str(tmp_path / "missing"), "model-v1") is None
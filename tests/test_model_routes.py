@@ -0,0 +1,55 @@
+import os
+
+import pandas as pd
+import pytest
+
+os.environ.setdefault("NEO4J_USERNAME", "neo4j")
+os.environ.setdefault("NEO4J_PASSWORD", "neo4j")
+os.environ.setdefault("JWT_SECRET_KEY", "test")
+os.environ.setdefault("ADMIN_PASSWORD", "test")
+os.environ.setdefault("KGE_CACHE_USE_REDIS", "false")
+
+if not os.path.exists("app/data/model_epoch_final.pkl") or not os.path.exists(
+    "app/data/node_id_final.pkl"
+):
+    pytest.skip(
+        "KGE model and node mappings are not available", allow_module_level=True
+    )
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import model_routes  # noqa: E402
+
+app = FastAPI()
+app.include_router(model_routes.router)
+client = TestClient(app)
+
+node_mappings = pd.read_pickle(model_routes.node_mappings_path)
+node_labels = dict(zip(node_mappings["Node"], node_mappings["Label"]))
+
+
+def predicted_labels(relation: str) -> set:
+    response = client.get(
+        "/predict_tail",
+        params={"head": 3, "relation": relation, "type_constrained": True},
+    )
+    assert response.status_code == 200
+    return {node_labels[p["tail_entity"]] for p in response.json()["predictions"]}
+
+
+def test_typed_predictions_are_not_shared_between_relations_with_one_id():
+    # protein_disease and disease_protein map to the same relation id
+    assert (
+        model_routes.edge_mapping["protein_disease"]
+        == model_routes.edge_mapping["disease_protein"]
+    )
+    assert predicted_labels("protein_disease") == {"Disease"}
+    assert predicted_labels("disease_protein") == {"Protein"}
+
+
+def test_typed_key_names_the_candidate_label():
+    assert model_routes.type_key("protein_disease", False) == "all"
+    assert model_routes.type_key("protein_disease", True) != model_routes.type_key(
+        "disease_protein", True
+    )
@@ -0,0 +1,28 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+
+os.environ.setdefault("NEO4J_USERNAME", "neo4j")
+os.environ.setdefault("NEO4J_PASSWORD", "neo4j")
+os.environ.setdefault("JWT_SECRET_KEY", "test")
+os.environ.setdefault("ADMIN_PASSWORD", "test")
+
+from app.routes import decode_cursor, encode_cursor  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "element_id",
+    ["5:0b6e2b3c-8f1e-4c3a-9d2f-1a2b3c4d5e6f:42", "7", "é:?>~"],
+)
+def test_cursor_round_trips(element_id):
+    cursor = encode_cursor(element_id)
+    assert "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor) == element_id
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "_w==", "a"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
@@ -0,0 +1,36 @@
+import pandas as pd
+import torch
+
+from app.kge.scoring import dense_rank, top_k
+
+
+def test_top_k_returns_best_first():
+    ids, scores = top_k(torch.tensor([0.1, 0.9, 0.5, 0.7]), 3)
+    assert ids.tolist() == [1, 3, 2]
+    assert scores.tolist() == torch.tensor([0.9, 0.7, 0.5]).tolist()
+
+
+def test_top_k_breaks_ties_by_ascending_id():
+    ids, _ = top_k(torch.tensor([0.5, 0.9, 0.5, 0.5, 0.9]), 5)
+    assert ids.tolist() == [1, 4, 0, 2, 3]
+
+
+def test_top_k_tie_straddling_kth_position_keeps_lowest_ids():
+    ids, _ = top_k(torch.tensor([0.3, 0.5, 0.9, 0.5, 0.5]), 3)
+    assert ids.tolist() == [2, 1, 3]
+
+
+def test_top_k_clamps_k():
+    scores = torch.tensor([0.2, 0.1])
+    assert top_k(scores, 10)[0].tolist() == [0, 1]
+    assert top_k(scores, 0)[0].numel() == 0
+
+
+def test_dense_rank_matches_pandas():
+    scores = torch.tensor([0.4, 0.9, 0.4, 0.7, 0.9, 0.1])
+    expected = pd.Series(scores.tolist()).rank(ascending=False, method="dense")
+    for index in range(len(scores)):
+        rank, score, max_score = dense_rank(scores, index)
+        assert rank == int(expected[index])
+        assert score == float(scores[index])
+        assert max_score == float(scores.max())
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_for_a_key_run_once():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def main():
+        results = await asyncio.gather(
+            flight.do("a", lambda: fetch("a")),
+            flight.do("a", lambda: fetch("a")),
+            flight.do("b", lambda: fetch("b")),
+        )
+        # Nothing is cached once the call has finished
+        again = await flight.do("a", lambda: fetch("a"))
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert results == ["A", "A", "B"]
+    assert again == "A"
+    assert calls == ["a", "b", "a"]
+    metrics = flight.metrics()
+    assert (metrics["executions"], metrics["coalesced"]) == (3, 1)
+    assert metrics["in_flight"] == 0
+
+
+def test_errors_are_shared_by_every_caller():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("query failed")
+
+    async def main():
+        return await asyncio.gather(
+            flight.do("a", fail), flight.do("a", fail), return_exceptions=True
+        )
+
+    first, second = asyncio.run(main())
+    assert isinstance(first, ValueError)
+    assert second is first
+
+
+def test_cancelled_caller_does_not_cancel_the_call():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return 1
+
+    async def main():
+        impatient = asyncio.ensure_future(flight.do("a", slow))
+        patient = asyncio.ensure_future(flight.do("a", slow))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(main()) == 1